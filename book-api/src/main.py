@@ -10,6 +10,7 @@ from src.routes.user import user_bp
 from src.routes.enhanced_book import enhanced_book_bp
 from src.routes.translation import translation_bp
 from src.routes.llm import llm_bp
+from src.routes.health import health_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -21,6 +22,7 @@ app.register_blueprint(user_bp, url_prefix="/api")
 app.register_blueprint(enhanced_book_bp, url_prefix="/api/books")
 app.register_blueprint(translation_bp, url_prefix="/api/translate")
 app.register_blueprint(llm_bp, url_prefix="/api/llm")
+app.register_blueprint(health_bp, url_prefix="/api/health")
 
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
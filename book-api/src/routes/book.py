@@ -1,7 +1,8 @@
-import requests
 import os
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
+from src.services import http_client
+from src.services.arabic_text import is_mostly_arabic
 
 book_bp = Blueprint('book', __name__)
 
@@ -26,10 +27,7 @@ def search_books():
         search_query = query
         if language == 'ar':
             # Simple Arabic detection
-            arabic_chars = sum(1 for char in query if '\u0600' <= char <= '\u06FF' or '\u0750' <= char <= '\u077F')
-            total_chars = len([char for char in query if char.isalpha()])
-            
-            if total_chars > 0 and arabic_chars / total_chars > 0.3:
+            if is_mostly_arabic(query):
                 # Translate Arabic to English for search
                 translated_query = translate_arabic_to_english(query)
                 if translated_query:
@@ -64,7 +62,7 @@ def translate_arabic_to_english(text):
             'de': 'bookfinder@example.com'
         }
         
-        response = requests.get('https://api.mymemory.translated.net/get', params=params, timeout=5)
+        response = http_client.get('https://api.mymemory.translated.net/get', params=params, timeout=5)
         response.raise_for_status()
         
         data = response.json()
@@ -85,7 +83,7 @@ def search_google_books(query):
             'printType': 'books'
         }
         
-        response = requests.get(GOOGLE_BOOKS_API, params=params, timeout=10)
+        response = http_client.get(GOOGLE_BOOKS_API, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -125,7 +123,7 @@ def search_gutendx_books(query):
             'page_size': 10
         }
         
-        response = requests.get(GUTENDX_API, params=params, timeout=10)
+        response = http_client.get(GUTENDX_API, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -1,505 +1,252 @@
-import requests
+import httpx
 import os
-from flask import Blueprint, request, jsonify
+import time
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import cross_origin
 from epub2pdf import EpubPdfConverter
 import json
 
-from src.routes.llm import extract_book_info, intelligent_search_planning, enhance_search_results, localize_book_categories, quick_translate_categories
-from src.routes.arabic_books import search_aco, enhanced_arabic_search
+from src.services.book_llm import quick_translate_categories, get_arabic_category_mapping
+from src.services.fanout import iter_fanout
+from src.services import catalog, http_client, llm_cache, pdf_url_cache, request_memo, result_cache, search_service, session_store, singleflight, translation_memory
+from src.services.search_service import (
+    SearchRequest, PDF_SOURCE_NAMES, first_page_offsets, build_pdf_priority_tasks, decode_page_cursor,
+    paginate_pdf_results, reached_pdf_target, rank_pdf_results, build_pdf_priority_payload,
+    pdf_priority_cache_ttl, compute_pdf_priority_search
+)
 
 enhanced_book_bp = Blueprint("enhanced_book", __name__)
 
-GOOGLE_BOOKS_API = "https://www.googleapis.com/books/v1/volumes"
-GUTENDX_API = "https://gutendx.com/books"
-
-# Helper function to get PDF URL from Google Books API response
-def get_google_books_pdf_url(access_info):
-    if access_info and access_info.get("viewability") == "FULL" and access_info.get("pdf") and access_info["pdf"].get("isAvailable"):
-        return access_info["pdf"].get("acsTokenLink") or access_info["pdf"].get("downloadLink")
-    return None
-
-# Helper function to get PDF URL from Gutendx API response
-def get_gutendx_pdf_url(formats):
-    if formats:
-        # Prioritize application/pdf, then text/html, then text/plain
-        if "application/pdf" in formats:
-            return formats["application/pdf"]
-        elif "text/html" in formats:
-            return formats["text/html"]
-        elif "text/plain" in formats:
-            return formats["text/plain"]
-    return None
-
-# Helper function to get PDF URL from Internet Archive with multiple fallbacks
-def get_internet_archive_pdf_url(identifier):
-    """Get the actual PDF download URL by querying Internet Archive metadata with multiple fallbacks"""
-    if not identifier:
-        return None
-
-    pdf_urls = []
-
-    try:
-        # Method 1: Query Internet Archive metadata API to get file list
-        metadata_url = f"https://archive.org/metadata/{identifier}"
-        response = requests.get(metadata_url, timeout=10)
-
-        if response.ok:
-            metadata = response.json()
-            files = metadata.get("files", [])
-
-            # Look for PDF files
-            for file in files:
-                file_name = file.get("name", "")
-                file_format = file.get("format", "")
-
-                # Check if it's a PDF file (either by extension or format)
-                if (file_name.lower().endswith('.pdf') or
-                    file_format.lower() in ['pdf', 'text pdf']):
-                    pdf_url = f"https://archive.org/download/{identifier}/{file_name}"
-                    pdf_urls.append(pdf_url)
+STREAM_MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+def format_stream_frame(frame, stream_format):
+    """Serialize one stream frame as an NDJSON line or an SSE event"""
+    payload = json.dumps(frame, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {frame['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+def replay_pdf_priority_payload(payload, cache_info, stream_format):
+    """Yield a finished pdf-priority-search payload as a single merge frame followed by the summary"""
+    yield format_stream_frame({
+        "type": "merge",
+        "results": payload["results"],
+        "pdf_count": payload["pdf_count"],
+        "total_count": payload["total_count"]
+    }, stream_format)
+    summary = {key: value for key, value in payload.items() if key != "results"}
+    yield format_stream_frame({"type": "summary", **summary, "cache": cache_info}, stream_format)
+
+def stream_pdf_priority_search(query, lang, deadline, stream_format, cache_key, include_local=False, target=None):
+    """
+    Yield PDF-first search frames as sources finish:
+    - local: matches from the local catalog, before any upstream call (with include_local)
+    - batch: one source's raw results
+    - merge: the merged, PDF-first result set so far
+    - summary: final counts, which sources timed out or failed, next_cursor and cache status
+    A cached result is sent as a single merge frame followed by the summary, and so is the
+    result of an identical search already in flight (streamed or not), once it finishes.
+    With a target, the stream ends once that many reliable PDFs are found.
+    """
+    if include_local:
+        yield format_stream_frame({"type": "local", "results": catalog.search_catalog(query)}, stream_format)
 
-            # If we found PDFs, return the first one
-            if pdf_urls:
-                return pdf_urls[0]
+    compute = lambda: compute_pdf_priority_search(query, lang, deadline, target=target)
+    payload, cache_info = result_cache.get(cache_key, compute=compute, ttl_for=pdf_priority_cache_ttl)
+    if cache_info:
+        yield from replay_pdf_priority_payload(payload, cache_info, stream_format)
+        return
 
-    except Exception as e:
-        print(f"Error getting PDF URL from metadata for {identifier}: {e}")
-
-    # Method 2: Try common PDF filename patterns
-    fallback_patterns = [
-        f"{identifier}.pdf",
-        f"{identifier.replace('-', ' ')}.pdf",
-        f"{identifier.replace('-', '_')}.pdf",
-        f"{identifier.title().replace('-', ' ')}.pdf",
-        f"{identifier.upper()}.pdf",
-        f"{identifier.lower()}.pdf"
-    ]
-
-    for pattern in fallback_patterns:
+    wait = search_service.search_flights.begin(cache_key)
+    if wait is not None:
         try:
-            test_url = f"https://archive.org/download/{identifier}/{pattern}"
-            # Quick HEAD request to check if file exists
-            head_response = requests.head(test_url, timeout=5)
-            if head_response.status_code == 200:
-                return test_url
-        except:
-            continue
-
-    # Method 3: Return the most likely URL even if we can't verify it
-    return f"https://archive.org/download/{identifier}/{identifier}.pdf"
-
-def search_google_books(search_terms, language="en", author=None):
-    """Search Google Books with intelligent query construction"""
-    try:
-        # Construct search query
-        query_parts = search_terms.copy()
-        if author:
-            query_parts.append(f"author:{author}")
-        
-        search_query = " ".join(query_parts)
-        
-        params = {
-            "q": search_query,
-            "langRestrict": language,
-            "maxResults": 10
-        }
-        
-        response = requests.get(GOOGLE_BOOKS_API, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        books = []
-        for item in data.get("items", []):
-            volume_info = item.get("volumeInfo", {})
-            access_info = item.get("accessInfo", {})
-            
-            title = volume_info.get("title")
-            authors = volume_info.get("authors", [])
-            categories = volume_info.get("categories", [])
-            description = volume_info.get("description")
-            image_links = volume_info.get("imageLinks", {})
-            thumbnail = image_links.get("thumbnail")
-            info_link = volume_info.get("infoLink")
-            
-            pdf_url = get_google_books_pdf_url(access_info)
-            
-            books.append({
-                "title": title,
-                "author": ", ".join(authors),
-                "categories": categories,
-                "description": description,
-                "thumbnail": thumbnail,
-                "info_link": info_link,
-                "pdf_links": [{"source": "Google Books", "url": pdf_url}] if pdf_url else [],
-                "source": "google_books"
-            })
-        
-        return books
-    except Exception as e:
-        print(f"Error searching Google Books: {e}")
-        return []
-
-def search_gutendx(search_terms, language="en"):
-    """Search Gutendx for public domain books"""
-    try:
-        search_query = " ".join(search_terms)
-        params = {"search": search_query}
-        
-        response = requests.get(GUTENDX_API, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        books = []
-        for result in data.get("results", []):
-            pdf_url = get_gutendx_pdf_url(result.get("formats"))
-            
-            if pdf_url:  # Only include books with available PDFs
-                books.append({
-                    "title": result.get("title"),
-                    "author": ", ".join([author.get("name", "") for author in result.get("authors", [])]),
-                    "categories": result.get("subjects", []),
-                    "description": "",  # Gutendx doesn't provide descriptions
-                    "thumbnail": None,  # Gutendx doesn't provide thumbnails directly
-                    "info_link": result.get("formats", {}).get("text/html"),
-                    "pdf_links": [{"source": "Gutendx", "url": pdf_url}],
-                    "source": "gutendx"
-                })
-        
-        return books
-    except Exception as e:
-        print(f"Error searching Gutendx: {e}")
-        return []
-
-def search_project_gutenberg(search_terms):
-    """Search Project Gutenberg for free ebooks"""
-    books = []
-    try:
-        search_query = " ".join(search_terms)
-        # Project Gutenberg search API
-        params = {
-            "search": search_query,
-            "format": "json"
-        }
-
-        response = requests.get("https://gutendx.com/books/", params=params, timeout=10)
-        if response.ok:
-            data = response.json()
-
-            for book in data.get("results", [])[:10]:  # Limit to 10 results
-                title = book.get("title", "")
-                authors = book.get("authors", [])
-                author = ", ".join([a.get("name", "") for a in authors]) if authors else ""
-                subjects = book.get("subjects", [])
-
-                # Get PDF download links
-                formats = book.get("formats", {})
-                pdf_links = []
-
-                for format_key, url in formats.items():
-                    if "pdf" in format_key.lower():
-                        pdf_links.append({
-                            "source": "Project Gutenberg",
-                            "url": url
-                        })
-
-                if pdf_links:  # Only include books with PDF links
-                    books.append({
-                        "title": title,
-                        "author": author,
-                        "categories": subjects,
-                        "description": f"Free ebook from Project Gutenberg. Subjects: {', '.join(subjects[:3])}",
-                        "thumbnail": "",
-                        "info_link": f"https://www.gutenberg.org/ebooks/{book.get('id', '')}",
-                        "pdf_links": pdf_links,
-                        "source": "project_gutenberg"
-                    })
-
-    except Exception as e:
-        print(f"Project Gutenberg search failed: {e}")
-
-    return books
+            payload = wait()
+        except Exception as e:
+            # The leading search failed or its client went away; run this one without streaming
+            print(f"Coalesced PDF search failed ({e}), searching again")
+            payload = compute()
+        yield from replay_pdf_priority_payload(payload, {"hit": False, "coalesced": True}, stream_format)
+        return
 
-def search_open_library(search_terms):
-    """Search Open Library for books with available downloads"""
-    books = []
+    finished = False
     try:
-        search_query = " ".join(search_terms)
-        params = {
-            "q": search_query,
-            "format": "json",
-            "limit": 10
-        }
-
-        response = requests.get("https://openlibrary.org/search.json", params=params, timeout=10)
-        if response.ok:
-            data = response.json()
-
-            for doc in data.get("docs", []):
-                title = doc.get("title", "")
-                author_names = doc.get("author_name", [])
-                author = ", ".join(author_names) if author_names else ""
-                subjects = doc.get("subject", [])
-
-                # Check if book has available formats
-                ia_id = doc.get("ia", [])
-                if ia_id:
-                    # If it has Internet Archive ID, it might have downloadable formats
-                    pdf_links = []
-                    for archive_id in ia_id[:1]:  # Check first archive ID
-                        pdf_url = get_internet_archive_pdf_url(archive_id)
-                        if pdf_url:
-                            pdf_links.append({
-                                "source": "Open Library (Internet Archive)",
-                                "url": pdf_url
-                            })
-
-                    if pdf_links:
-                        books.append({
-                            "title": title,
-                            "author": author,
-                            "categories": subjects[:5] if subjects else [],
-                            "description": f"Available through Open Library. Subjects: {', '.join(subjects[:3]) if subjects else 'Various'}",
-                            "thumbnail": f"https://covers.openlibrary.org/b/id/{doc.get('cover_i', '')}-M.jpg" if doc.get('cover_i') else "",
-                            "info_link": f"https://openlibrary.org{doc.get('key', '')}",
-                            "pdf_links": pdf_links,
-                            "source": "open_library"
-                        })
-
-    except Exception as e:
-        print(f"Open Library search failed: {e}")
-
-    return books
-
-def search_internet_archive_comprehensive(search_terms):
-    """Comprehensive Internet Archive search with multiple strategies"""
+        payload = yield from stream_pdf_priority_sources(query, lang, deadline, stream_format, target)
+        result_cache.put(cache_key, payload, pdf_priority_cache_ttl(payload))
+        search_service.search_flights.finish(cache_key, payload)
+        finished = True
+    finally:
+        # Covers errors and clients disconnecting (the generator is closed mid-stream)
+        if not finished:
+            search_service.search_flights.finish(cache_key, error=RuntimeError("Streamed search did not finish"))
+
+    summary = {key: value for key, value in payload.items() if key != "results"}
+    yield format_stream_frame({"type": "summary", **summary, "cache": {"hit": False}}, stream_format)
+
+def stream_pdf_priority_sources(query, lang, deadline, stream_format, target=None):
+    """Yield batch and merge frames while the sources are searched; returns the final payload"""
+    started = time.monotonic()
+    offsets = first_page_offsets()
     all_books = []
-    search_query = " ".join(search_terms)
-
-    # Strategy 1: Direct title search with PDF format
-    try:
-        params1 = {
-            "q": f"title:({search_query}) AND mediatype:texts AND format:PDF",
-            "fl": "identifier,title,creator,description,subject,downloads",
-            "rows": 15,
-            "sort": "downloads desc",
-            "output": "json"
-        }
-        response1 = requests.get("https://archive.org/advancedsearch.php", params=params1, timeout=15)
-        if response1.ok:
-            data1 = response1.json()
-            all_books.extend(parse_internet_archive_response(data1))
-    except Exception as e:
-        print(f"IA Strategy 1 failed: {e}")
-
-    # Strategy 2: Broader search without strict title matching
-    try:
-        params2 = {
-            "q": f"({search_query}) AND mediatype:texts AND format:PDF",
-            "fl": "identifier,title,creator,description,subject,downloads",
-            "rows": 10,
-            "sort": "downloads desc",
-            "output": "json"
-        }
-        response2 = requests.get("https://archive.org/advancedsearch.php", params=params2, timeout=15)
-        if response2.ok:
-            data2 = response2.json()
-            all_books.extend(parse_internet_archive_response(data2))
-    except Exception as e:
-        print(f"IA Strategy 2 failed: {e}")
+    results = {}
+    pdf_books, non_pdf_books = [], []
+    timed_out = []
+    failed = []
+    settled = set()
+
+    # Sources share one request memo, so duplicate upstream queries go out once
+    memo = request_memo.new_memo()
+    tasks = [(source, request_memo.bind(memo, fn), budget) for source, fn, budget in build_pdf_priority_tasks([query], lang, offsets)]
+    fanout = iter_fanout(tasks, deadline=deadline)
+    for source, status, result in fanout:
+        settled.add(source)
+        if status == "timeout":
+            timed_out.append(PDF_SOURCE_NAMES[source])
+            continue
+        if status == "error":
+            print(f"{PDF_SOURCE_NAMES[source]} search failed: {result}")
+            failed.append(PDF_SOURCE_NAMES[source])
+            continue
 
-    # Strategy 3: Search for any text format, then filter for PDFs
-    try:
-        params3 = {
-            "q": f"title:({search_query}) AND mediatype:texts",
-            "fl": "identifier,title,creator,description,subject,downloads",
-            "rows": 20,
-            "sort": "downloads desc",
-            "output": "json"
-        }
-        response3 = requests.get("https://archive.org/advancedsearch.php", params=params3, timeout=15)
-        if response3.ok:
-            data3 = response3.json()
-            # Parse and filter for books that actually have PDFs
-            potential_books = parse_internet_archive_response(data3)
-            for book in potential_books:
-                if book.get("pdf_links"):  # Only add if PDF links exist
-                    all_books.append(book)
-    except Exception as e:
-        print(f"IA Strategy 3 failed: {e}")
-
-    # Remove duplicates
-    seen_identifiers = set()
-    unique_books = []
-    for book in all_books:
-        identifier = book.get("info_link", "").split("/")[-1]
-        if identifier not in seen_identifiers:
-            seen_identifiers.add(identifier)
-            unique_books.append(book)
-
-    return unique_books
-
-def parse_internet_archive_response(data):
-    """Parse Internet Archive API response"""
-    books = []
-    for doc in data.get("response", {}).get("docs", []):
-        identifier = doc.get("identifier")
-        title = doc.get("title")
-        creator = doc.get("creator", [])
-        description = doc.get("description", "")
-        subjects = doc.get("subject", [])
-
-        if isinstance(creator, list):
-            author = ", ".join(creator)
-        else:
-            author = creator or ""
+        print(f"{PDF_SOURCE_NAMES[source]} found {len(result)} books")
+        results[source] = result
+        yield format_stream_frame({
+            "type": "batch",
+            "source": PDF_SOURCE_NAMES[source],
+            "results": result
+        }, stream_format)
 
-        if isinstance(description, list):
-            description = " ".join(description)
+        if not result:
+            continue
 
-        if isinstance(subjects, list):
-            categories = subjects
-        else:
-            categories = [subjects] if subjects else []
-
-        pdf_url = get_internet_archive_pdf_url(identifier)
-
-        books.append({
-            "title": title,
-            "author": author,
-            "categories": categories,
-            "description": description,
-            "thumbnail": f"https://archive.org/services/img/{identifier}",
-            "info_link": f"https://archive.org/details/{identifier}",
-            "pdf_links": [{"source": "Internet Archive", "url": pdf_url}] if pdf_url else [],
-            "source": "internet_archive"
-        })
+        all_books.extend(result)
+        pdf_books, non_pdf_books = rank_pdf_results(all_books)
+        yield format_stream_frame({
+            "type": "merge",
+            "results": pdf_books + non_pdf_books,
+            "pdf_count": len(pdf_books),
+            "total_count": len(pdf_books) + len(non_pdf_books)
+        }, stream_format)
 
-    return books
+        if target and reached_pdf_target(pdf_books, target):
+            fanout.close()
+            break
 
-def search_internet_archive(search_terms):
-    """Search Internet Archive for books with PDF downloads"""
-    return search_internet_archive_comprehensive(search_terms)
+    skipped = [PDF_SOURCE_NAMES[source] for source, _, _ in tasks if source not in settled]
 
-def merge_duplicate_books(books):
-    """Merge books with same title and author, combining their PDF links"""
-    merged_books = {}
-    
-    for book in books:
-        key = f"{book.get('title', '').lower()}_{book.get('author', '').lower()}"
-        
-        if key in merged_books:
-            # Merge PDF links
-            existing_sources = [link.get("source") for link in merged_books[key]["pdf_links"]]
-            for pdf_link in book.get("pdf_links", []):
-                if pdf_link.get("source") not in existing_sources:
-                    merged_books[key]["pdf_links"].append(pdf_link)
-            
-            # Update other fields if they're empty in the existing book
-            if not merged_books[key].get("description") and book.get("description"):
-                merged_books[key]["description"] = book["description"]
-            if not merged_books[key].get("thumbnail") and book.get("thumbnail"):
-                merged_books[key]["thumbnail"] = book["thumbnail"]
-            if not merged_books[key].get("categories") and book.get("categories"):
-                merged_books[key]["categories"] = book["categories"]
-        else:
-            merged_books[key] = book.copy()
-    
-    return list(merged_books.values())
+    catalog.ingest_books(pdf_books + non_pdf_books)
+    pdf_books, non_pdf_books, next_cursor = paginate_pdf_results(
+        query, lang, 1, offsets, results, pdf_books, non_pdf_books, target=target
+    )
+    return build_pdf_priority_payload(
+        pdf_books, non_pdf_books, timed_out, failed, round(time.monotonic() - started, 3),
+        next_cursor=next_cursor, skipped=skipped
+    )
 
 @enhanced_book_bp.route("/pdf-priority-search", methods=["POST"])
 @cross_origin()
 def pdf_priority_search():
     """
     PDF-First Book Search - Prioritizes finding downloadable PDFs from multiple sources
+    All sources are searched concurrently; sources that miss the deadline are reported in sources_timed_out
+    Pass "stream": "ndjson" or "sse" to receive results per source as they arrive,
+    plus "include_local": true to get local catalog matches before any upstream call
+    Results are cached per query and language; the "cache" field says whether and how old
+    Pass the "next_cursor" of a response as "cursor" to get the next page; it carries the
+    query and language, and only returns books not seen on earlier pages
+    Pass "target_pdf_results": n to respond as soon as n PDFs from the most reliable
+    sources are found; sources still running are listed in sources_skipped
     """
     try:
         data = request.get_json()
-        query = data.get("query")
-        lang = data.get("lang", "en")
-
-        if not query:
-            return jsonify({"error": "Query is required"}), 400
+        cursor = data.get("cursor")
+        page_cursor = None
 
-        print(f"PDF-Priority search for: {query}")
-        all_books = []
-        search_terms = [query]
+        if cursor:
+            try:
+                page_cursor = decode_page_cursor(cursor)
+            except ValueError as e:
+                print(f"Invalid cursor: {e}")
+                return jsonify({"error": "Invalid cursor"}), 400
 
-        # Step 1: Search Internet Archive (comprehensive search)
-        print("Searching Internet Archive for PDFs...")
         try:
-            ia_books = search_internet_archive_comprehensive(search_terms)
-            all_books.extend(ia_books)
-            print(f"Internet Archive found {len(ia_books)} books")
-        except Exception as e:
-            print(f"Internet Archive search failed: {e}")
+            if page_cursor:
+                search = SearchRequest(
+                    page_cursor["query"], page_cursor.get("lang", "en"), data.get("deadline"),
+                    target=page_cursor.get("target"),
+                    page=page_cursor.get("page", 2),
+                    offsets=page_cursor["offsets"],
+                    seen=page_cursor["seen"]
+                )
+            else:
+                search = SearchRequest(data.get("query"), data.get("lang", "en"), data.get("deadline"), target=data.get("target_pdf_results"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stream_format = data.get("stream")
+        if stream_format is True:
+            stream_format = "ndjson"
+        if stream_format and stream_format not in STREAM_MIMETYPES:
+            return jsonify({"error": "Stream must be 'ndjson' or 'sse'"}), 400
+
+        # Later pages depend on what this client has already seen, so they are not streamed
+        if page_cursor:
+            print(f"PDF-Priority search for: {search.query} (page {search.page})")
+        else:
+            print(f"PDF-Priority search for: {search.query}")
+
+        if stream_format and search.is_first_page:
+            return Response(
+                stream_with_context(stream_pdf_priority_search(
+                    search.query, search.lang, search.deadline, stream_format, search.cache_key,
+                    include_local=bool(data.get("include_local")),
+                    target=search.target
+                )),
+                mimetype=STREAM_MIMETYPES[stream_format],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        payload, cache_info = search_service.pdf_search(search)
+        return jsonify({**payload, "cache": cache_info})
 
-        # Step 2: Search Project Gutenberg for public domain PDFs
-        print("Searching Project Gutenberg for PDFs...")
-        try:
-            gutenberg_books = search_project_gutenberg(search_terms)
-            all_books.extend(gutenberg_books)
-            print(f"Project Gutenberg found {len(gutenberg_books)} books")
-        except Exception as e:
-            print(f"Project Gutenberg search failed: {e}")
+    except Exception as e:
+        print(f"Error in PDF priority search: {e}")
+        return jsonify({"error": "Search failed"}), 500
 
-        # Step 3: Search Open Library
-        print("Searching Open Library for PDFs...")
-        try:
-            openlibrary_books = search_open_library(search_terms)
-            all_books.extend(openlibrary_books)
-            print(f"Open Library found {len(openlibrary_books)} books")
-        except Exception as e:
-            print(f"Open Library search failed: {e}")
+@enhanced_book_bp.route("/local-search", methods=["POST"])
+@cross_origin()
+def local_search():
+    """
+    Search the local catalog of every book previously returned by our searches
+    No upstream calls are made, so this answers in milliseconds
+    """
+    try:
+        data = request.get_json()
+        query = data.get("query")
 
-        # Step 4: Search Gutendx as fallback
-        print("Searching Gutendx for public domain PDFs...")
-        try:
-            gutendx_books = search_gutendx(search_terms, language=lang)
-            all_books.extend(gutendx_books)
-            print(f"Gutendx found {len(gutendx_books)} books")
-        except Exception as e:
-            print(f"Gutendx search failed: {e}")
+        if not query:
+            return jsonify({"error": "Query is required"}), 400
 
-        # Step 5: Search Google Books (for metadata, rarely has free PDFs)
-        print("Searching Google Books for metadata...")
         try:
-            google_books = search_google_books(search_terms, language=lang)
-            all_books.extend(google_books)
-            print(f"Google Books found {len(google_books)} books")
-        except Exception as e:
-            print(f"Google Books search failed: {e}")
-
-        # Step 6: Merge and prioritize books with PDFs
-        merged_books = merge_duplicate_books(all_books)
-
-        # Sort by PDF availability (books with PDFs first)
-        pdf_books = [book for book in merged_books if book.get("pdf_links")]
-        non_pdf_books = [book for book in merged_books if not book.get("pdf_links")]
+            limit = max(1, min(int(data.get("limit", 20)), 100))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Limit must be a number"}), 400
 
-        # Further sort PDF books by source reliability
-        source_priority = {
-            "internet_archive": 1,
-            "project_gutenberg": 2,
-            "open_library": 3,
-            "gutendx": 4,
-            "google_books": 5
-        }
-
-        pdf_books.sort(key=lambda x: source_priority.get(x.get("source", ""), 99))
-
-        final_results = pdf_books + non_pdf_books
+        started = time.monotonic()
+        results = catalog.search_catalog(query, limit=limit)
+        pdf_count = sum(1 for book in results if book.get("pdf_links"))
 
         return jsonify({
-            "results": final_results,
-            "pdf_count": len(pdf_books),
-            "total_count": len(final_results),
-            "sources_searched": ["Internet Archive", "Project Gutenberg", "Open Library", "Gutendx", "Google Books"],
-            "message": f"Found {len(pdf_books)} books with PDF downloads out of {len(final_results)} total results"
+            "results": results,
+            "pdf_count": pdf_count,
+            "total_count": len(results),
+            "search_time": round(time.monotonic() - started, 4)
         })
 
     except Exception as e:
-        print(f"Error in PDF priority search: {e}")
+        print(f"Error in local search: {e}")
         return jsonify({"error": "Search failed"}), 500
 
 @enhanced_book_bp.route("/enhanced-search", methods=["POST"])
@@ -508,6 +255,7 @@ def enhanced_search():
     """
     LLM-First Enhanced Book Search
     Uses LLM to understand the query, plan the search strategy, and enhance results
+    Results are cached per query and language; the "cache" field says whether and how old
     """
     try:
         data = request.get_json()
@@ -517,95 +265,10 @@ def enhanced_search():
         if not query:
             return jsonify({"error": "Query is required"}), 400
 
-        # Step 1: Use LLM to extract structured information from the query
-        print(f"Extracting information from query: {query}")
-        extracted_info = extract_book_info(query)
-        print(f"Extracted info: {extracted_info}")
-
-        # Step 2: Use LLM to create an intelligent search plan
-        print("Creating intelligent search plan...")
-        search_plan = intelligent_search_planning(query, extracted_info)
-        print(f"Search plan: {search_plan}")
+        payload, cache_info = search_service.enhanced_search(query, lang)
+        return jsonify({**payload, "cache": cache_info})
 
-        # Step 3: Execute searches based on LLM's plan
-        all_books = []
-        
-        # Determine search terms from LLM analysis
-        search_terms = search_plan.get("search_terms", [query])
-        if extracted_info.get("title"):
-            search_terms.insert(0, extracted_info["title"])
-        
-        # Execute searches in priority order
-        priority_sources = search_plan.get("priority_order", ["google_books", "gutendx", "aco"])
-        
-        for source in priority_sources:
-            print(f"Searching {source}...")
-            
-            if source == "google_books" and "google_books" in search_plan.get("primary_sources", []):
-                books = search_google_books(
-                    search_terms, 
-                    language=extracted_info.get("language", lang),
-                    author=extracted_info.get("author")
-                )
-                all_books.extend(books)
-            
-            elif source == "gutendx" and "gutendx" in search_plan.get("primary_sources", []):
-                books = search_gutendx(search_terms, language=extracted_info.get("language", lang))
-                all_books.extend(books)
-            
-            elif source == "aco" and "aco" in search_plan.get("primary_sources", []):
-                # Use enhanced Arabic search for better results
-                if (extracted_info.get("language") == "ar" or 
-                    any(c in "أب ت ث ج ح خ د ذ ر ز س ش ص ض ط ظ ع غ ف ق ك ل م ن ه و ي" for c in query)):
-                    aco_results = enhanced_arabic_search(query, sources=["aco", "rapidapi", "noor", "gutenberg"])
-                    for aco_book in aco_results:
-                        all_books.append({
-                            "title": aco_book["title"],
-                            "author": aco_book["author"],
-                            "categories": aco_book.get("categories", []),
-                            "description": aco_book.get("description", ""),
-                            "thumbnail": None,
-                            "info_link": None,
-                            "pdf_links": aco_book["pdf_links"],
-                            "source": aco_book["source"]
-                        })
-            
-            elif source == "internet_archive" and "internet_archive" in search_plan.get("primary_sources", []):
-                books = search_internet_archive(search_terms)
-                all_books.extend(books)
-
-        # Step 4: Merge duplicate books
-        print("Merging duplicate books...")
-        merged_books = merge_duplicate_books(all_books)
-
-        # Step 5: Use LLM to enhance and rank results
-        print("Enhancing search results with LLM...")
-        enhanced_books, ranking_explanation = enhance_search_results(merged_books, query)
-
-        # Step 6: Apply Arabic category localization if needed
-        if extracted_info.get("language") == "ar" or lang == "ar":
-            print("Applying Arabic category localization...")
-            localized_books = []
-            for book in enhanced_books:
-                if book.get("categories"):
-                    # Quick translate categories to Arabic
-                    book["categories"] = quick_translate_categories(book["categories"])
-                localized_books.append(book)
-            enhanced_books = localized_books
-
-        # Step 7: Return results with LLM insights
-        return jsonify({
-            "results": enhanced_books,
-            "search_insights": {
-                "extracted_info": extracted_info,
-                "search_plan": search_plan,
-                "ranking_explanation": ranking_explanation,
-                "total_sources_searched": len(priority_sources),
-                "total_results_found": len(enhanced_books)
-            }
-        })
-
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error during enhanced search: {e}")
         return jsonify({"error": f"External API error: {e}"}), 500
     except Exception as e:
@@ -624,13 +287,12 @@ def convert_to_pdf():
             return jsonify({"error": "File URL is required"}), 400
 
         # Download the file first
-        response = requests.get(file_url, stream=True)
-        response.raise_for_status()
-
         input_path = f"/tmp/{os.path.basename(file_url)}"
-        with open(input_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        with http_client.stream("GET", file_url, timeout=60) as response:
+            response.raise_for_status()
+            with open(input_path, "wb") as f:
+                for chunk in response.iter_bytes(chunk_size=8192):
+                    f.write(chunk)
 
         output_path = f"/tmp/{output_filename}"
         converter = EpubPdfConverter(input_path, output_path)
@@ -682,6 +344,28 @@ def localize_categories():
         print(f"Error in localize_categories: {e}")
         return jsonify({"error": "Category localization failed"}), 500
 
+@enhanced_book_bp.route("/cache-stats", methods=["GET"])
+@cross_origin()
+def cache_stats():
+    """
+    Hit/miss counters for the search and LLM caches, and the size of the chat session store
+    and of the translation memory (translated categories per language)
+    """
+    try:
+        return jsonify({
+            "pdf_url_cache": pdf_url_cache.get_stats(),
+            "result_cache": result_cache.get_stats(),
+            "coalesced_searches": search_service.get_stats(),
+            "coalesced_providers": singleflight.get_stats(),
+            "request_memo": request_memo.get_stats(),
+            "llm_cache": llm_cache.get_stats(),
+            "chat_sessions": session_store.get_stats(),
+            "translation_memory": translation_memory.get_stats()
+        })
+    except Exception as e:
+        print(f"Error getting cache stats: {e}")
+        return jsonify({"error": "Failed to get cache stats"}), 500
+
 @enhanced_book_bp.route("/category-mapping", methods=["GET"])
 @cross_origin()
 def get_category_mapping():
@@ -689,7 +373,6 @@ def get_category_mapping():
     Get the predefined category mapping for Arabic
     """
     try:
-        from src.routes.llm import get_arabic_category_mapping
         mapping = get_arabic_category_mapping()
         return jsonify({
             "mapping": mapping,
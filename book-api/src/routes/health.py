@@ -0,0 +1,54 @@
+from flask import Blueprint, jsonify
+from flask_cors import cross_origin
+
+from src.services import gutenberg_catalog, provider_health
+
+health_bp = Blueprint("health", __name__)
+
+# Upstream hosts the search providers call, for readable health output
+PROVIDER_HOSTS = {
+    "www.googleapis.com": "Google Books",
+    "gutendx.com": "Gutendx",
+    "gutendex.com": "Gutendex",
+    "www.gutenberg.org": "Project Gutenberg",
+    "openlibrary.org": "Open Library",
+    "covers.openlibrary.org": "Open Library Covers",
+    "archive.org": "Internet Archive",
+    "dlib.nyu.edu": "Arabic Collections Online",
+    "www.noor-book.com": "Noor Book",
+    "api.mymemory.translated.net": "MyMemory"
+}
+
+@health_bp.route("/providers", methods=["GET"])
+@cross_origin()
+def providers_health():
+    """
+    Circuit state, error rate, latency percentiles and adaptive timeout per upstream endpoint
+    (host plus first path segment); only endpoints called since the process started are listed
+    """
+    try:
+        endpoints = provider_health.get_stats()
+        providers = []
+        for endpoint, stats in sorted(endpoints.items()):
+            host = endpoint.split("/", 1)[0]
+            providers.append({"endpoint": endpoint, "host": host, "provider": PROVIDER_HOSTS.get(host, host), **stats})
+        return jsonify({
+            "providers": providers,
+            "open_circuits": [provider["endpoint"] for provider in providers if provider["state"] != provider_health.CLOSED]
+        })
+    except Exception as e:
+        print(f"Error getting provider health: {e}")
+        return jsonify({"error": "Failed to get provider health"}), 500
+
+@health_bp.route("/gutenberg-catalog", methods=["GET"])
+@cross_origin()
+def gutenberg_catalog_health():
+    """
+    Whether the local Project Gutenberg index is loaded, how many books it holds and when it was last refreshed
+    Until it is ready, Project Gutenberg lookups go to the live Gutendex API
+    """
+    try:
+        return jsonify(gutenberg_catalog.get_stats())
+    except Exception as e:
+        print(f"Error getting Gutenberg catalog health: {e}")
+        return jsonify({"error": "Failed to get Gutenberg catalog health"}), 500
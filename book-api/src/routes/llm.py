@@ -1,54 +1,52 @@
-import os
+import contextvars
 import json
-import requests
-from flask import Blueprint, request, jsonify, session
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from flask_cors import cross_origin
-from groq import Groq
+from src.services import chat_context, search_service, session_store
+from src.services.book_llm import client, LLM_MODEL
 
 llm_bp = Blueprint("llm", __name__)
 
-# Initialize Groq client with API key from environment variable
-# It's safer to use environment variables for API keys in production
-# For local testing, you can directly put your key here, but remove it before committing to public repo
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "your-secret-key-here")
-client = Groq(api_key=GROQ_API_KEY)
+# Older chat turns are folded into a rolling summary (see chat_context); this hard cap
+# only matters when summaries can't be generated
+CHAT_HISTORY_MAX_MESSAGES = 60
 
-# In-memory chat sessions storage (in production, use Redis or database)git rm --cached book-api/src/routes/llm.py
+# Summaries are written in the background, after the reply has been sent
+_chat_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+_folding = set()
+_folding_lock = threading.Lock()
 
-chat_sessions = {}
+# How long (seconds) a chat reply waits for its PDF search, counted from when both started,
+# and how long a cancelled search gets to hand back what it already found
+CHAT_SEARCH_DEADLINE = 8
+CHAT_SEARCH_CANCEL_GRACE = 1
 
-def search_books_for_pdf(query):
+# Chat PDF searches run beside the completion. They fan out to providers themselves,
+# so they get their own pool rather than holding workers in the provider pool.
+_chat_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-search")
+
+def search_books_for_pdf(query, deadline=None, cancel=None):
     """Search for books and return PDF links"""
     try:
-        # Call our own PDF-priority search API
-        response = requests.post(
-            "http://localhost:5000/api/books/pdf-priority-search",
-            json={"query": query, "lang": "en"},
-            timeout=30
-        )
-
-        if response.ok:
-            data = response.json()
-            results = data.get("results", [])
+        # Only the top 5 are shown, so stop once that many reliable PDFs are found
+        search = search_service.SearchRequest(query, "en", deadline, target=5)
+        data, _ = search_service.pdf_search(search, cancel=cancel)
+        results = data.get("results", [])
 
-            # Filter books that have PDF links
-            pdf_books = [book for book in results if book.get("pdf_links")]
+        # Filter books that have PDF links
+        pdf_books = [book for book in results if book.get("pdf_links")]
 
-            return pdf_books[:5]  # Return top 5 PDF books
+        return pdf_books[:5]  # Return top 5 PDF books
 
     except Exception as e:
         print(f"Error searching for PDFs: {e}")
 
     return []
 
-def get_chat_session(session_id):
-    """Get or create a chat session"""
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": """You are a helpful AI book assistant. You can:
+CHAT_SYSTEM_PROMPT = """You are a helpful AI book assistant. You can:
 1. Recommend books based on user preferences
 2. Provide information about books, authors, and genres
 3. Search for and provide PDF download links for books
@@ -56,94 +54,241 @@ def get_chat_session(session_id):
 
 When a user asks for a book or PDF, you should search for it and provide direct download links if available.
 Be conversational and remember the context of our chat. Always be helpful and informative."""
-                }
-            ]
-        }
-    return chat_sessions[session_id]
+
+def build_chat_messages(session_id, user_message):
+    """The messages sent to the model: system prompt, rolling summary, recent history within the token budget, then the new message"""
+    summary, history = session_store.load(session_id)
+    messages, prompt_tokens = chat_context.build_prompt(CHAT_SYSTEM_PROMPT, summary, history, user_message)
+    print(f"Chat prompt for {session_id}: ~{prompt_tokens} tokens, {len(messages) - 1} messages")
+    return messages
+
+def is_book_request(user_message):
+    """Whether the user is asking for a book or PDF"""
+    book_request_keywords = ["pdf", "download", "book", "find", "search", "get me", "looking for"]
+    return any(keyword in user_message.lower() for keyword in book_request_keywords)
+
+def find_pdfs_for_message(user_message, deadline=None, cancel=None):
+    """If the user is asking for a book or PDF, search for downloadable copies"""
+    if not is_book_request(user_message):
+        return []
+
+    # Try to extract book name from the message
+    book_query = user_message
+    # Remove common request words to get cleaner book title
+    for word in ["find", "get", "download", "pdf", "book", "me", "the", "a", "an"]:
+        book_query = book_query.replace(word, " ").strip()
+
+    # Search for PDFs
+    return search_books_for_pdf(book_query, deadline, cancel)
+
+class PdfSearch:
+    """
+    A chat PDF search running in the background while the reply is generated.
+    Not started at all when the message is not a book request.
+    """
+
+    def __init__(self, user_message, deadline=CHAT_SEARCH_DEADLINE):
+        self.expires_at = time.monotonic() + deadline
+        self.cancel = threading.Event()
+        self.future = None
+        if is_book_request(user_message):
+            context = contextvars.copy_context()
+            self.future = _chat_search_executor.submit(
+                context.run, find_pdfs_for_message, user_message, deadline, self.cancel
+            )
+
+    def done(self):
+        return self.future is None or self.future.done()
+
+    def join(self):
+        """The PDF results, waiting out what is left of the deadline; a late search is cancelled"""
+        if self.future is None:
+            return []
+        try:
+            return self.future.result(timeout=max(0, self.expires_at - time.monotonic()))
+        except FutureTimeoutError:
+            print("Chat PDF search missed its deadline, cancelling")
+            self.cancel.set()
+        try:
+            return self.future.result(timeout=CHAT_SEARCH_CANCEL_GRACE)
+        except FutureTimeoutError:
+            return []
+
+def format_pdf_results(pdf_results):
+    """The PDF downloads block appended to the assistant's reply"""
+    if not pdf_results:
+        return ""
+
+    block = "\n\n📚 **PDF Downloads Found:**\n"
+    for i, book in enumerate(pdf_results, 1):
+        block += f"\n{i}. **{book['title']}**"
+        if book.get('author'):
+            block += f" by {book['author']}"
+
+        for pdf_link in book.get('pdf_links', []):
+            block += f"\n   📄 [Download PDF]({pdf_link['url']}) (Source: {pdf_link['source']})"
+        block += "\n"
+    return block
+
+def commit_chat_turn(session_id, user_message, reply, pdf_results):
+    """Add the user's message and the assistant's reply (without its PDF links) to the session history"""
+    session_store.append(
+        session_id,
+        [("user", user_message), ("assistant", chat_context.compact_reply(reply, pdf_results))],
+        keep_last=CHAT_HISTORY_MAX_MESSAGES
+    )
+    schedule_history_fold(session_id)
+
+def summarize_chat(summary, messages):
+    """Fold messages into the running summary of a conversation with one LLM call"""
+    transcript = "\n".join(f"{role.capitalize()}: {content}" for role, content in messages)
+    prompt = f"""
+    Update the running summary of a conversation between a user and a book assistant.
+    Keep the books, authors, genres and preferences the user mentioned, what they asked for and
+    what was recommended or shared. Drop greetings and small talk. Use at most 150 words.
+
+    Current summary:
+    {summary or "(none)"}
+
+    New messages:
+    {transcript}
+
+    Reply with the updated summary only.
+    """
+
+    chat_completion = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=LLM_MODEL,
+        max_tokens=chat_context.SUMMARY_MAX_TOKENS,
+        temperature=0.2
+    )
+    return chat_completion.choices[0].message.content.strip()
+
+def fold_chat_history(session_id):
+    """Fold a session's older turns into its summary once its history outgrows the token budget"""
+    try:
+        summary, history = session_store.load(session_id)
+        folded = chat_context.messages_to_fold(history)
+        if not folded:
+            return
+
+        new_summary = summarize_chat(summary, folded)
+        if session_store.fold(session_id, folded, new_summary):
+            print(f"Folded {len(folded)} messages of chat {session_id} into its summary")
+    except Exception as e:
+        print(f"Error summarizing chat history: {e}")
+    finally:
+        with _folding_lock:
+            _folding.discard(session_id)
+
+def schedule_history_fold(session_id):
+    """Start fold_chat_history in the background, unless that session is already being folded"""
+    with _folding_lock:
+        if session_id in _folding:
+            return
+        _folding.add(session_id)
+    _chat_summary_executor.submit(fold_chat_history, session_id)
+
+def sse_event(event, data):
+    """Serialize one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_chat(messages, session_id, user_message, pdf_search):
+    """
+    Yield the reply as server-sent events:
+    - token: each piece of the reply as the model produces it
+    - pdf_results: the structured PDF results and their text block, sent as soon as the
+      search running beside the completion finishes (at the latest, just before done)
+    - done: the full reply (including the PDF block); the history is committed at this point
+    - error: the completion failed; nothing is committed
+    """
+    pdf_results = None
+
+    try:
+        completion_stream = client.chat.completions.create(
+            messages=messages,
+            model=LLM_MODEL,
+            max_tokens=1000,
+            temperature=0.7,
+            stream=True
+        )
+
+        pieces = []
+        for chunk in completion_stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                pieces.append(token)
+                yield sse_event("token", {"text": token})
+            if pdf_results is None and pdf_search.done():
+                pdf_results = pdf_search.join()
+                if pdf_results:
+                    yield sse_event("pdf_results", {"pdf_results": pdf_results, "text": format_pdf_results(pdf_results)})
+    except Exception as e:
+        print(f"Error in streamed LLM chat: {e}")
+        pdf_search.cancel.set()
+        yield sse_event("error", {"error": "Internal server error"})
+        return
+
+    if pdf_results is None:
+        pdf_results = pdf_search.join()
+        if pdf_results:
+            yield sse_event("pdf_results", {"pdf_results": pdf_results, "text": format_pdf_results(pdf_results)})
+
+    reply = "".join(pieces)
+    llm_response = reply + format_pdf_results(pdf_results)
+    commit_chat_turn(session_id, user_message, reply, pdf_results)
+    yield sse_event("done", {"response": llm_response, "session_id": session_id})
 
 @llm_bp.route("/chat", methods=["POST"])
 @cross_origin()
 def chat():
+    """
+    Chat with the book assistant
+    Pass "stream": true to receive the reply as server-sent events (see stream_chat)
+    """
     try:
         data = request.get_json()
         user_message = data.get("message")
         session_id = data.get("session_id", "default")
 
-        if not user_message:
+        if not user_message or not isinstance(user_message, str):
             return jsonify({"error": "Message is required"}), 400
+        if not session_store.is_valid_session_id(session_id):
+            return jsonify({"error": f"session_id must be a non-empty string of at most {session_store.MAX_SESSION_ID_LENGTH} characters"}), 400
 
-        # Get chat session with history
-        chat_session = get_chat_session(session_id)
-
-        # Add user message to history
-        chat_session["messages"].append({
-            "role": "user",
-            "content": user_message
-        })
-
-        # Check if user is asking for a book or PDF
-        book_request_keywords = ["pdf", "download", "book", "find", "search", "get me", "looking for"]
-        is_book_request = any(keyword in user_message.lower() for keyword in book_request_keywords)
-
-        enhanced_message = user_message
-        pdf_results = []
+        # Conversation so far plus the new message; the turn is stored once the reply is complete
+        messages = build_chat_messages(session_id, user_message)
 
-        if is_book_request:
-            # Try to extract book name from the message
-            book_query = user_message
-            # Remove common request words to get cleaner book title
-            for word in ["find", "get", "download", "pdf", "book", "me", "the", "a", "an"]:
-                book_query = book_query.replace(word, " ").strip()
+        # The PDF search and the completion run at the same time; the reply waits for
+        # the search only until its deadline
+        pdf_search = PdfSearch(user_message)
 
-            # Search for PDFs
-            pdf_results = search_books_for_pdf(book_query)
-
-            if pdf_results:
-                pdf_info = "\n\nI found these PDF downloads for you:\n"
-                for i, book in enumerate(pdf_results, 1):
-                    pdf_info += f"\n{i}. **{book['title']}**"
-                    if book.get('author'):
-                        pdf_info += f" by {book['author']}"
-
-                    for pdf_link in book.get('pdf_links', []):
-                        pdf_info += f"\n   📄 Download PDF: {pdf_link['url']}"
-                        pdf_info += f" (Source: {pdf_link['source']})"
-                    pdf_info += "\n"
-
-                enhanced_message += pdf_info
+        if data.get("stream"):
+            return Response(
+                stream_with_context(stream_chat(messages, session_id, user_message, pdf_search)),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
 
         # Create chat completion with full conversation history
-        chat_completion = client.chat.completions.create(
-            messages=chat_session["messages"],
-            model="llama3-8b-8192",
-            max_tokens=1000,
-            temperature=0.7
-        )
-
-        llm_response = chat_completion.choices[0].message.content
+        try:
+            chat_completion = client.chat.completions.create(
+                messages=messages,
+                model=LLM_MODEL,
+                max_tokens=1000,
+                temperature=0.7
+            )
+        except Exception:
+            pdf_search.cancel.set()
+            raise
+        pdf_results = pdf_search.join()
 
         # If we found PDFs, append them to the response
-        if pdf_results:
-            llm_response += "\n\n📚 **PDF Downloads Found:**\n"
-            for i, book in enumerate(pdf_results, 1):
-                llm_response += f"\n{i}. **{book['title']}**"
-                if book.get('author'):
-                    llm_response += f" by {book['author']}"
-
-                for pdf_link in book.get('pdf_links', []):
-                    llm_response += f"\n   📄 [Download PDF]({pdf_link['url']}) (Source: {pdf_link['source']})"
-                llm_response += "\n"
-
-        # Add assistant response to history
-        chat_session["messages"].append({
-            "role": "assistant",
-            "content": llm_response
-        })
+        reply = chat_completion.choices[0].message.content
+        llm_response = reply + format_pdf_results(pdf_results)
 
-        # Keep only last 20 messages to prevent context from getting too long
-        if len(chat_session["messages"]) > 20:
-            # Keep system message and last 19 messages
-            chat_session["messages"] = [chat_session["messages"][0]] + chat_session["messages"][-19:]
+        # Add the turn to history
+        commit_chat_turn(session_id, user_message, reply, pdf_results)
 
         return jsonify({
             "response": llm_response,
@@ -175,7 +320,7 @@ def related_books():
                     "content": prompt,
                 }
             ],
-            model="llama3-8b-8192",
+            model=LLM_MODEL,
         )
 
         llm_response = chat_completion.choices[0].message.content
@@ -193,388 +338,3 @@ def related_books():
     except Exception as e:
         print(f"Error in related books suggestion: {e}")
         return jsonify({"error": "Internal server error"}), 500
-
-
-
-
-def extract_book_info(query):
-    """
-    Extract structured book information from a natural language query using LLM
-    """
-    try:
-        prompt = f"""
-        Extract book information from this query: "{query}"
-        
-        Please respond with a JSON object containing:
-        - title: The book title (if mentioned)
-        - author: The author name (if mentioned)
-        - categories: List of relevant book categories/genres
-        - language: Detected language of the query ("en" for English, "ar" for Arabic, etc.)
-        - search_strategy: Recommended search approach ("general", "academic", "fiction", "arabic_specific", etc.)
-        - keywords: List of important keywords for searching
-        
-        If information is not available, use null for strings/arrays or empty array for lists.
-        Respond only with valid JSON.
-        """
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-8b-8192",
-        )
-
-        llm_response = chat_completion.choices[0].message.content
-        
-        # Try to parse JSON response
-        try:
-            import json
-            return json.loads(llm_response)
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "title": None,
-                "author": None,
-                "categories": [],
-                "language": "en",
-                "search_strategy": "general",
-                "keywords": [query]
-            }
-
-    except Exception as e:
-        print(f"Error in extract_book_info: {e}")
-        return {
-            "title": None,
-            "author": None,
-            "categories": [],
-            "language": "en",
-            "search_strategy": "general",
-            "keywords": [query]
-        }
-
-def intelligent_search_planning(query, extracted_info):
-    """
-    Use LLM to create an intelligent search plan based on the query and extracted information
-    """
-    try:
-        prompt = f"""
-        Based on this book search query: "{query}"
-        And extracted information: {extracted_info}
-        
-        Create a search plan with the following JSON structure:
-        {{
-            "primary_sources": ["google_books", "gutendex", "aco", "internet_archive"],
-            "search_terms": ["term1", "term2"],
-            "filters": {{
-                "language": "en/ar",
-                "category": "category_if_specific",
-                "availability": "free/paid/any"
-            }},
-            "priority_order": ["source1", "source2"],
-            "expected_results": "description of what type of results to expect"
-        }}
-        
-        Consider:
-        - If query is in Arabic or mentions Arabic books, prioritize ACO
-        - If looking for classic/public domain books, prioritize Gutendex
-        - For general search with covers/descriptions, prioritize Google Books
-        - For academic/research books, consider Internet Archive
-        
-        Respond only with valid JSON.
-        """
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-8b-8192",
-        )
-
-        llm_response = chat_completion.choices[0].message.content
-        
-        try:
-            import json
-            return json.loads(llm_response)
-        except json.JSONDecodeError:
-            # Fallback plan
-            return {
-                "primary_sources": ["google_books", "gutendx", "aco"],
-                "search_terms": [query],
-                "filters": {
-                    "language": extracted_info.get("language", "en"),
-                    "category": None,
-                    "availability": "any"
-                },
-                "priority_order": ["google_books", "gutendx", "aco"],
-                "expected_results": "General book search results"
-            }
-
-    except Exception as e:
-        print(f"Error in intelligent_search_planning: {e}")
-        return {
-            "primary_sources": ["google_books", "gutendx", "aco"],
-            "search_terms": [query],
-            "filters": {
-                "language": extracted_info.get("language", "en"),
-                "category": None,
-                "availability": "any"
-            },
-            "priority_order": ["google_books", "gutendx", "aco"],
-            "expected_results": "General book search results"
-        }
-
-def enhance_search_results(results, original_query):
-    """
-    Use LLM to enhance and rank search results based on relevance to the original query
-    """
-    try:
-        # Prepare a summary of results for LLM analysis
-        results_summary = []
-        for i, book in enumerate(results[:10]):  # Limit to first 10 for LLM processing
-            results_summary.append({
-                "index": i,
-                "title": book.get("title", ""),
-                "author": book.get("author", ""),
-                "categories": book.get("categories", [])
-            })
-
-        prompt = f"""
-        Original search query: "{original_query}"
-        Search results: {results_summary}
-        
-        Please analyze these results and provide:
-        1. Relevance scores (0-100) for each result
-        2. Reordered indices based on relevance
-        3. Brief explanation of why certain results are more relevant
-        
-        Respond with JSON:
-        {{
-            "relevance_scores": [score1, score2, ...],
-            "reordered_indices": [index1, index2, ...],
-            "explanation": "Brief explanation of ranking logic"
-        }}
-        """
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-8b-8192",
-        )
-
-        llm_response = chat_completion.choices[0].message.content
-        
-        try:
-            import json
-            enhancement_data = json.loads(llm_response)
-            
-            # Reorder results based on LLM recommendations
-            reordered_indices = enhancement_data.get("reordered_indices", list(range(len(results))))
-            enhanced_results = []
-            
-            for idx in reordered_indices:
-                if idx < len(results):
-                    enhanced_results.append(results[idx])
-            
-            # Add any remaining results that weren't reordered
-            for i, result in enumerate(results):
-                if i not in reordered_indices:
-                    enhanced_results.append(result)
-            
-            return enhanced_results, enhancement_data.get("explanation", "")
-            
-        except json.JSONDecodeError:
-            return results, "Unable to enhance results ranking"
-
-    except Exception as e:
-        print(f"Error in enhance_search_results: {e}")
-        return results, "Error in result enhancement"
-
-
-
-def translate_categories_to_arabic(categories):
-    """
-    Translate English book categories to Arabic using LLM
-    """
-    try:
-        if not categories or len(categories) == 0:
-            return []
-        
-        categories_str = ", ".join(categories)
-        
-        prompt = f"""
-        Translate these book categories from English to Arabic. Provide accurate, commonly used Arabic terms for book categories.
-        
-        Categories to translate: {categories_str}
-        
-        Please respond with a JSON array of Arabic translations in the same order as the input categories.
-        For example: ["الأدب", "التاريخ", "العلوم"]
-        
-        If a category doesn't have a direct Arabic equivalent, provide the closest meaningful Arabic term.
-        Respond only with the JSON array.
-        """
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-8b-8192",
-        )
-
-        llm_response = chat_completion.choices[0].message.content
-        
-        try:
-            import json
-            arabic_categories = json.loads(llm_response)
-            return arabic_categories if isinstance(arabic_categories, list) else []
-        except json.JSONDecodeError:
-            # Fallback: try to extract categories from response
-            lines = llm_response.split('\n')
-            arabic_categories = []
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('[') and not line.startswith(']'):
-                    # Remove quotes and commas
-                    clean_line = line.replace('"', '').replace(',', '').strip()
-                    if clean_line:
-                        arabic_categories.append(clean_line)
-            return arabic_categories[:len(categories)]  # Limit to original count
-
-    except Exception as e:
-        print(f"Error in translate_categories_to_arabic: {e}")
-        return categories  # Return original categories as fallback
-
-def localize_book_categories(book_data, target_language="ar"):
-    """
-    Localize book categories based on target language
-    """
-    try:
-        if target_language != "ar":
-            return book_data  # No localization needed for non-Arabic
-        
-        if not book_data.get("categories"):
-            return book_data
-        
-        # Check if categories are already in Arabic
-        categories = book_data["categories"]
-        has_arabic = any(any(c in "أب ت ث ج ح خ د ذ ر ز س ش ص ض ط ظ ع غ ف ق ك ل م ن ه و ي" for c in cat) for cat in categories)
-        
-        if has_arabic:
-            # Categories already contain Arabic, no translation needed
-            return book_data
-        
-        # Translate categories to Arabic
-        arabic_categories = translate_categories_to_arabic(categories)
-        
-        # Create localized book data
-        localized_data = book_data.copy()
-        localized_data["categories"] = arabic_categories
-        localized_data["original_categories"] = categories  # Keep original for reference
-        
-        return localized_data
-
-    except Exception as e:
-        print(f"Error in localize_book_categories: {e}")
-        return book_data
-
-def get_arabic_category_mapping():
-    """
-    Get a predefined mapping of common English to Arabic book categories
-    """
-    return {
-        "Fiction": "الأدب الخيالي",
-        "Non-fiction": "الأدب غير الخيالي", 
-        "History": "التاريخ",
-        "Science": "العلوم",
-        "Technology": "التكنولوجيا",
-        "Philosophy": "الفلسفة",
-        "Religion": "الدين",
-        "Biography": "السيرة الذاتية",
-        "Poetry": "الشعر",
-        "Drama": "المسرح",
-        "Literature": "الأدب",
-        "Education": "التعليم",
-        "Psychology": "علم النفس",
-        "Medicine": "الطب",
-        "Law": "القانون",
-        "Economics": "الاقتصاد",
-        "Politics": "السياسة",
-        "Art": "الفن",
-        "Music": "الموسيقى",
-        "Sports": "الرياضة",
-        "Travel": "السفر",
-        "Cooking": "الطبخ",
-        "Health": "الصحة",
-        "Business": "الأعمال",
-        "Self-help": "تطوير الذات",
-        "Romance": "الرومانسية",
-        "Mystery": "الغموض",
-        "Thriller": "الإثارة",
-        "Horror": "الرعب",
-        "Fantasy": "الخيال",
-        "Science Fiction": "الخيال العلمي",
-        "Children": "الأطفال",
-        "Young Adult": "الشباب",
-        "Comics": "الكوميكس",
-        "Reference": "المراجع",
-        "Textbook": "الكتب المدرسية",
-        "Academic": "الأكاديمي",
-        "Research": "البحث",
-        "Mathematics": "الرياضيات",
-        "Physics": "الفيزياء",
-        "Chemistry": "الكيمياء",
-        "Biology": "الأحياء",
-        "Geography": "الجغرافيا",
-        "Sociology": "علم الاجتماع",
-        "Anthropology": "علم الإنسان",
-        "Linguistics": "علم اللغة",
-        "Journalism": "الصحافة",
-        "Media": "الإعلام"
-    }
-
-def quick_translate_categories(categories):
-    """
-    Quick translation using predefined mapping, fallback to LLM for unknown categories
-    """
-    try:
-        mapping = get_arabic_category_mapping()
-        translated = []
-        unknown_categories = []
-        
-        for category in categories:
-            if category in mapping:
-                translated.append(mapping[category])
-            else:
-                unknown_categories.append(category)
-                translated.append(category)  # Keep original for now
-        
-        # Use LLM for unknown categories
-        if unknown_categories:
-            llm_translations = translate_categories_to_arabic(unknown_categories)
-            
-            # Replace unknown categories with LLM translations
-            unknown_index = 0
-            for i, category in enumerate(categories):
-                if category in unknown_categories:
-                    if unknown_index < len(llm_translations):
-                        translated[i] = llm_translations[unknown_index]
-                    unknown_index += 1
-        
-        return translated
-        
-    except Exception as e:
-        print(f"Error in quick_translate_categories: {e}")
-        return categories
-
@@ -1,6 +1,7 @@
-import requests
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
+from src.services import http_client
+from src.services.arabic_text import is_mostly_arabic
 
 translation_bp = Blueprint('translation', __name__)
 
@@ -27,7 +28,7 @@ def translate_text():
             'de': 'bookfinder@example.com'  # Contact email for higher limits
         }
         
-        response = requests.get(MYMEMORY_API, params=params, timeout=10)
+        response = http_client.get(MYMEMORY_API, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -73,10 +74,7 @@ def detect_language():
             return jsonify({'language': 'en'})
         
         # Simple Arabic detection based on Unicode ranges
-        arabic_chars = sum(1 for char in text if '\u0600' <= char <= '\u06FF' or '\u0750' <= char <= '\u077F')
-        total_chars = len([char for char in text if char.isalpha()])
-        
-        if total_chars > 0 and arabic_chars / total_chars > 0.3:
+        if is_mostly_arabic(text):
             return jsonify({'language': 'ar'})
         else:
             return jsonify({'language': 'en'})
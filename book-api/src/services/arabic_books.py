@@ -1,12 +1,16 @@
-import requests
+import httpx
 from bs4 import BeautifulSoup
 import json
 import os
+from src.services import gutendex, http_client
+from src.services.singleflight import coalesce
+from src.services.arabic_text import dedup_key, strip_marks
 
 def search_aco(query, max_results=10):
     """
     Enhanced Arabic Collections Online (ACO) search with improved error handling and parsing
     """
+    query = strip_marks(query)
     try:
         # Construct search URL with proper encoding
         search_url = f"https://dlib.nyu.edu/aco/search/?q={query}&scope=containsAny"
@@ -14,7 +18,7 @@ def search_aco(query, max_results=10):
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         
-        response = requests.get(search_url, headers=headers, timeout=10)
+        response = http_client.get(search_url, headers=headers, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
         
@@ -99,7 +103,7 @@ def search_aco(query, max_results=10):
         
         return results
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error searching ACO: {e}")
         return []
     except Exception as e:
@@ -110,6 +114,7 @@ def search_rapidapi_arabic_books(query, max_results=10):
     """
     Search Arabic books using RapidAPI Arabic Books Library
     """
+    query = strip_marks(query)
     try:
         # Note: In production, this should be an environment variable
         rapidapi_key = os.environ.get("RAPIDAPI_KEY", "")
@@ -127,7 +132,7 @@ def search_rapidapi_arabic_books(query, max_results=10):
         
         params = {"title": query}
         
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = http_client.get(url, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -165,7 +170,7 @@ def search_rapidapi_arabic_books(query, max_results=10):
         
         return results
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error searching RapidAPI Arabic Books: {e}")
         return []
     except Exception as e:
@@ -176,6 +181,7 @@ def search_noor_library(query, max_results=10):
     """
     Search Noor Library for Arabic books (web scraping approach)
     """
+    query = strip_marks(query)
     try:
         # Noor Library search URL
         search_url = "https://www.noor-book.com/en/search"
@@ -185,7 +191,7 @@ def search_noor_library(query, max_results=10):
         
         params = {"q": query}
         
-        response = requests.get(search_url, headers=headers, params=params, timeout=10)
+        response = http_client.get(search_url, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
         
@@ -246,7 +252,7 @@ def search_noor_library(query, max_results=10):
         
         return results
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error searching Noor Library: {e}")
         return []
     except Exception as e:
@@ -257,61 +263,46 @@ def search_project_gutenberg_arabic(query, max_results=10):
     """
     Search Project Gutenberg for Arabic books
     """
+    query = strip_marks(query)
     try:
-        # Project Gutenberg API for Arabic books
-        url = "https://gutendx.com/books"
-        params = {
-            "search": query,
-            "languages": "ar",
-            "mime_type": "application/pdf"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        books = gutendex.search(query, languages="ar", mime_type="application/pdf")
         
         results = []
         
-        for book in data.get("results", [])[:max_results]:
-            try:
-                title = book.get("title", "N/A")
-                authors = book.get("authors", [])
-                author = ", ".join([a.get("name", "") for a in authors]) if authors else "N/A"
-                
-                # Get PDF download link
-                formats = book.get("formats", {})
-                pdf_url = formats.get("application/pdf")
-                
-                pdf_links = []
-                if pdf_url:
-                    pdf_links.append({"type": "pdf", "url": pdf_url})
-                
-                results.append({
-                    "title": title,
-                    "author": author,
-                    "pdf_links": pdf_links,
-                    "source": "project_gutenberg_arabic"
-                })
-                
-            except Exception as e:
-                print(f"Error parsing Project Gutenberg result: {e}")
-                continue
+        for book in books[:max_results]:
+            # Get PDF download link
+            pdf_url = book["formats"].get("application/pdf")
+            
+            pdf_links = []
+            if pdf_url:
+                pdf_links.append({"type": "pdf", "url": pdf_url})
+            
+            results.append({
+                "title": book["title"] or "N/A",
+                "author": ", ".join(book["authors"]) or "N/A",
+                "pdf_links": pdf_links,
+                "source": "project_gutenberg_arabic"
+            })
         
         return results
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error searching Project Gutenberg Arabic: {e}")
         return []
     except Exception as e:
         print(f"An unexpected error occurred during Project Gutenberg search: {e}")
         return []
 
+@coalesce
 def enhanced_arabic_search(query, sources=None, max_results_per_source=5):
     """
     Enhanced Arabic book search that combines multiple sources
     """
     if sources is None:
         sources = ["aco", "rapidapi", "noor", "gutenberg"]
+
+    # Harakat and tatweel only stop upstream engines from matching
+    query = strip_marks(query)
     
     all_results = []
     
@@ -339,7 +330,7 @@ def enhanced_arabic_search(query, sources=None, max_results_per_source=5):
     seen_titles = set()
     
     for result in all_results:
-        title_key = result["title"].lower().strip()
+        title_key = dedup_key(result["title"])
         if title_key not in seen_titles and len(title_key) > 2:
             seen_titles.add(title_key)
             unique_results.append(result)
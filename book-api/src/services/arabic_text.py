@@ -0,0 +1,93 @@
+import re
+import string
+import unicodedata
+
+# Any character from the Arabic, Arabic Supplement, Arabic Extended-A or presentation form blocks
+_ARABIC_CHAR = re.compile("[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]")
+
+# Harakat, Quranic marks and tatweel: never significant for matching
+_ARABIC_MARKS = [chr(c) for c in range(0x064B, 0x0660)] + ["\u0670", "\u0640"] + [chr(c) for c in range(0x06D6, 0x06EE)]
+
+# Latin combining accents left behind by NFKD
+_LATIN_MARKS = [chr(c) for c in range(0x0300, 0x0370)]
+
+_LETTER_FOLDS = {
+    # Alef variants (NFKD already splits most hamza forms into letter + mark)
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي",
+    # Taa marbuta and alef maqsura
+    "ة": "ه", "ى": "ي",
+    # Persian/Urdu forms commonly typed for Arabic letters
+    "ک": "ك", "ی": "ي"
+}
+
+_DIGITS = {chr(0x0660 + i): str(i) for i in range(10)}
+_DIGITS.update({chr(0x06F0 + i): str(i) for i in range(10)})
+
+_PUNCTUATION = string.punctuation + "،؛؟«»…–—‘’“”"
+
+# Removes marks only, for queries sent upstream where the letters must stay as typed
+_STRIP_MARKS_TABLE = str.maketrans({mark: None for mark in _ARABIC_MARKS})
+
+# Folds case, accents, marks, letter variants and digits
+_FOLD_TABLE = str.maketrans({
+    **{mark: None for mark in _ARABIC_MARKS + _LATIN_MARKS},
+    **_LETTER_FOLDS,
+    **_DIGITS,
+    **{upper: upper.lower() for upper in string.ascii_uppercase}
+})
+
+# Same as _FOLD_TABLE, plus punctuation becomes whitespace
+_KEY_TABLE = _FOLD_TABLE.copy()
+_KEY_TABLE.update({ord(char): " " for char in _PUNCTUATION})
+
+def _decompose(text):
+    # ASCII needs no decomposition; everything else is split into base letter + marks
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFKD", text).lower()
+
+def contains_arabic(text):
+    """True if the text contains any Arabic character"""
+    return bool(text) and _ARABIC_CHAR.search(text) is not None
+
+def is_mostly_arabic(text, threshold=0.3):
+    """True if more than threshold of the text's letters are Arabic"""
+    if not text:
+        return False
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return False
+    arabic = sum(1 for char in letters if _ARABIC_CHAR.match(char))
+    return arabic / len(letters) > threshold
+
+def strip_marks(text):
+    """Remove harakat and tatweel, keeping every letter as written"""
+    return (text or "").translate(_STRIP_MARKS_TABLE)
+
+def fold(text):
+    """Lowercase and strip accents, harakat and tatweel; unify Arabic letter variants and digits"""
+    if not text:
+        return ""
+    return _decompose(text).translate(_FOLD_TABLE)
+
+def cache_key(text):
+    """
+    Canonical form of a query for cache keys: folded and single-spaced, but keeping
+    punctuation and symbols, which can change what a query means ("C++", "C#", "C")
+    """
+    if not text:
+        return ""
+    return " ".join(fold(text).split())
+
+def search_key(text):
+    """Canonical form for matching: folded, punctuation-free, single-spaced"""
+    if not text:
+        return ""
+    return " ".join(_decompose(text).translate(_KEY_TABLE).split())
+
+def dedup_key(text):
+    """search_key with the Arabic definite article dropped, for matching titles"""
+    tokens = search_key(text).split()
+    # Only strip from words long enough that a root remains (keeps names like "اليس")
+    return " ".join(token[2:] if token.startswith("ال") and len(token) > 4 else token for token in tokens)
@@ -0,0 +1,431 @@
+import json
+import os
+import threading
+from groq import Groq
+
+from src.services import llm_cache, translation_memory
+from src.services.arabic_text import cache_key, contains_arabic
+
+# Initialize Groq client with API key from environment variable
+# It's safer to use environment variables for API keys in production
+# For local testing, you can directly put your key here, but remove it before committing to public repo
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "your-secret-key-here")
+client = Groq(api_key=GROQ_API_KEY)
+
+LLM_MODEL = "llama3-8b-8192"
+
+# Bump when a prompt template changes so cached answers for the old prompt stop matching
+UNDERSTAND_QUERY_VERSION = 1
+RANK_RESULTS_VERSION = 1
+
+# Sources the enhanced search knows how to query, and names the model may use for them
+SEARCH_SOURCES = ["google_books", "gutendx", "aco", "internet_archive"]
+SOURCE_ALIASES = {"gutendex": "gutendx", "project_gutenberg": "gutendx", "archive": "internet_archive"}
+
+def default_book_info(query):
+    """Local fallback for the extracted fields when the model's answer is missing or invalid"""
+    return {
+        "title": None,
+        "author": None,
+        "categories": [],
+        "language": "ar" if contains_arabic(query) else "en",
+        "search_strategy": "general",
+        "keywords": [query]
+    }
+
+def default_search_plan(query, language="en"):
+    """Local fallback search plan"""
+    return {
+        "primary_sources": ["google_books", "gutendx", "aco"],
+        "search_terms": [query],
+        "filters": {
+            "language": language,
+            "category": None,
+            "availability": "any"
+        },
+        "priority_order": ["google_books", "gutendx", "aco"],
+        "expected_results": "General book search results"
+    }
+
+def _text_or_none(value):
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+def _text_list(value):
+    if not isinstance(value, list):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+def _source_list(value):
+    sources = []
+    for source in _text_list(value):
+        source = SOURCE_ALIASES.get(source.lower(), source.lower())
+        if source in SEARCH_SOURCES and source not in sources:
+            sources.append(source)
+    return sources
+
+def validate_query_understanding(data, query):
+    """
+    Check the model's answer field by field against the expected schema, keeping
+    what is valid and filling the rest from the local defaults
+    """
+    extracted = data.get("extracted_info") if isinstance(data, dict) else None
+    plan = data.get("search_plan") if isinstance(data, dict) else None
+    extracted = extracted if isinstance(extracted, dict) else {}
+    plan = plan if isinstance(plan, dict) else {}
+
+    info = default_book_info(query)
+    info["title"] = _text_or_none(extracted.get("title"))
+    info["author"] = _text_or_none(extracted.get("author"))
+    info["categories"] = _text_list(extracted.get("categories"))
+    language = _text_or_none(extracted.get("language"))
+    if language and len(language) <= 5:
+        info["language"] = language.lower()
+    info["search_strategy"] = _text_or_none(extracted.get("search_strategy")) or info["search_strategy"]
+    info["keywords"] = _text_list(extracted.get("keywords")) or info["keywords"]
+
+    search_plan = default_search_plan(query, info["language"])
+    search_plan["primary_sources"] = _source_list(plan.get("primary_sources")) or search_plan["primary_sources"]
+    search_plan["search_terms"] = _text_list(plan.get("search_terms")) or search_plan["search_terms"]
+    # Every primary source gets searched; ones the model left out of the order go last
+    priority_order = [source for source in _source_list(plan.get("priority_order")) if source in search_plan["primary_sources"]]
+    search_plan["priority_order"] = priority_order + [source for source in search_plan["primary_sources"] if source not in priority_order]
+    filters = plan.get("filters") if isinstance(plan.get("filters"), dict) else {}
+    search_plan["filters"] = {
+        "language": _text_or_none(filters.get("language")) or info["language"],
+        "category": _text_or_none(filters.get("category")),
+        "availability": filters.get("availability") if filters.get("availability") in ("free", "paid", "any") else "any"
+    }
+    search_plan["expected_results"] = _text_or_none(plan.get("expected_results")) or search_plan["expected_results"]
+
+    return info, search_plan
+
+def complete_json(prompt):
+    """
+    Run one JSON-mode completion; returns (parsed JSON, usage) for llm_cache.cached_call.
+    Raises on API errors and invalid JSON.
+    """
+    chat_completion = client.chat.completions.create(
+        messages=[
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        model=LLM_MODEL,
+        response_format={"type": "json_object"},
+    )
+    usage = chat_completion.usage
+    return json.loads(chat_completion.choices[0].message.content), {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+    }
+
+def understand_query(query):
+    """
+    Extract structured book information from a natural language query and plan the
+    search in a single JSON-mode LLM call. Returns (extracted_info, search_plan);
+    invalid or missing fields fall back to local defaults.
+    """
+    prompt = f"""
+    Analyze this book search query: "{query}"
+
+    Respond with a JSON object with exactly this structure:
+    {{
+        "extracted_info": {{
+            "title": "the book title if mentioned, else null",
+            "author": "the author name if mentioned, else null",
+            "categories": ["relevant book categories/genres"],
+            "language": "language of the query: en, ar, ...",
+            "search_strategy": "general, academic, fiction, arabic_specific, ...",
+            "keywords": ["important keywords for searching"]
+        }},
+        "search_plan": {{
+            "primary_sources": ["sources to search, from: google_books, gutendx, aco, internet_archive"],
+            "search_terms": ["term1", "term2"],
+            "filters": {{
+                "language": "en/ar",
+                "category": "category if specific, else null",
+                "availability": "free/paid/any"
+            }},
+            "priority_order": ["primary sources, most useful first"],
+            "expected_results": "description of what type of results to expect"
+        }}
+    }}
+
+    When planning:
+    - If the query is in Arabic or mentions Arabic books, prioritize aco
+    - If looking for classic/public domain books, prioritize gutendx
+    - For general search with covers/descriptions, prioritize google_books
+    - For academic/research books, consider internet_archive
+    """
+
+    try:
+        data = llm_cache.cached_call(
+            LLM_MODEL, "understand_query", UNDERSTAND_QUERY_VERSION,
+            {"query": cache_key(query)},
+            lambda: complete_json(prompt)
+        )
+    except json.JSONDecodeError as e:
+        print(f"Query understanding returned invalid JSON, using defaults: {e}")
+        data = {}
+    except Exception as e:
+        print(f"Error in understand_query: {e}")
+        data = {}
+
+    return validate_query_understanding(data, query)
+
+def enhance_search_results(results, original_query):
+    """
+    Use LLM to enhance and rank search results based on relevance to the original query
+    """
+    try:
+        # Prepare a summary of results for LLM analysis
+        results_summary = []
+        for i, book in enumerate(results[:10]):  # Limit to first 10 for LLM processing
+            results_summary.append({
+                "index": i,
+                "title": book.get("title", ""),
+                "author": book.get("author", ""),
+                "categories": book.get("categories", [])
+            })
+
+        prompt = f"""
+        Original search query: "{original_query}"
+        Search results: {results_summary}
+        
+        Please analyze these results and provide:
+        1. Relevance scores (0-100) for each result
+        2. Reordered indices based on relevance
+        3. Brief explanation of why certain results are more relevant
+        
+        Respond with JSON:
+        {{
+            "relevance_scores": [score1, score2, ...],
+            "reordered_indices": [index1, index2, ...],
+            "explanation": "Brief explanation of ranking logic"
+        }}
+        """
+
+        # The same query over the same results ranks the same way, so the answer is memoized
+        try:
+            enhancement_data = llm_cache.cached_call(
+                LLM_MODEL, "rank_results", RANK_RESULTS_VERSION,
+                {"query": cache_key(original_query), "results": results_summary},
+                lambda: complete_json(prompt)
+            )
+            
+            # Reorder results based on LLM recommendations
+            reordered_indices = enhancement_data.get("reordered_indices", list(range(len(results))))
+            reordered_indices = [idx for idx in reordered_indices if isinstance(idx, int)]
+            enhanced_results = []
+            
+            for idx in dict.fromkeys(reordered_indices):
+                if 0 <= idx < len(results):
+                    enhanced_results.append(results[idx])
+            
+            # Add any remaining results that weren't reordered
+            for i, result in enumerate(results):
+                if i not in reordered_indices:
+                    enhanced_results.append(result)
+            
+            return enhanced_results, enhancement_data.get("explanation", "")
+            
+        except json.JSONDecodeError as e:
+            print(f"Result ranking returned invalid JSON: {e}")
+            return results, "Unable to enhance results ranking"
+
+    except Exception as e:
+        print(f"Error in enhance_search_results: {e}")
+        return results, "Error in result enhancement"
+
+
+
+# Most categories sent to the model in one translation call
+CATEGORY_TRANSLATION_BATCH_SIZE = 50
+
+# Categories being translated right now, so concurrent requests wait instead of paying twice
+_translating = {}
+_translating_lock = threading.Lock()
+
+def _llm_translate_categories(categories):
+    """One JSON-mode LLM call translating categories to Arabic; returns {category: translation}"""
+    prompt = f"""
+    Translate these book categories from English to Arabic. Provide accurate, commonly used Arabic terms for book categories.
+
+    Categories to translate: {json.dumps(categories, ensure_ascii=False)}
+
+    Respond with a JSON object mapping each category, exactly as given, to its Arabic translation.
+    For example: {{"Literature": "الأدب", "History": "التاريخ", "Science": "العلوم"}}
+
+    If a category doesn't have a direct Arabic equivalent, provide the closest meaningful Arabic term.
+    """
+
+    translations, usage = complete_json(prompt)
+    if not isinstance(translations, dict):
+        raise ValueError("Category translations must be a JSON object")
+    return {
+        category: translations[category].strip()
+        for category in categories
+        if isinstance(translations.get(category), str) and translations[category].strip()
+    }
+
+def translate_categories_to_arabic(categories):
+    """
+    Translate English book categories to Arabic, in order. Known categories come from
+    the predefined mapping and the translation memory; everything else is translated in
+    batched LLM calls (CATEGORY_TRANSLATION_BATCH_SIZE per call) and remembered, so each
+    category costs at most one call ever. Categories the model leaves out or answers with
+    a blank are remembered as themselves and returned unchanged.
+    """
+    try:
+        if not categories:
+            return []
+
+        mapping = get_arabic_category_mapping()
+        unique = [
+            category for category in dict.fromkeys(categories)
+            if category.strip() and category not in mapping and not contains_arabic(category)
+        ]
+        known = translation_memory.lookup(unique, "ar")
+        missing = [category for category in unique if category not in known]
+
+        # Claim the missing categories nobody else is translating; wait for the rest
+        with _translating_lock:
+            mine = [category for category in missing if category not in _translating]
+            theirs = {category: _translating[category] for category in missing if category in _translating}
+            done = threading.Event()
+            for category in mine:
+                _translating[category] = done
+
+        if mine:
+            try:
+                print(f"Translating {len(mine)} categories to Arabic")
+                for start in range(0, len(mine), CATEGORY_TRANSLATION_BATCH_SIZE):
+                    batch = mine[start:start + CATEGORY_TRANSLATION_BATCH_SIZE]
+                    translated = _llm_translate_categories(batch)
+                    # Untranslatable categories keep their English name rather than being asked for again
+                    translated = {category: translated.get(category, category) for category in batch}
+                    translation_memory.store(translated, "ar")
+                    known.update(translated)
+            except Exception as e:
+                print(f"Error translating categories to Arabic: {e}")
+            finally:
+                with _translating_lock:
+                    for category in mine:
+                        del _translating[category]
+                done.set()
+
+        if theirs:
+            for event in set(theirs.values()):
+                event.wait(timeout=30)
+            known.update(translation_memory.lookup(list(theirs), "ar"))
+
+        return [mapping.get(category) or known.get(category) or category for category in categories]
+
+    except Exception as e:
+        print(f"Error in translate_categories_to_arabic: {e}")
+        return categories  # Return original categories as fallback
+
+def localize_books_categories(books):
+    """Translate the categories of a whole result set to Arabic with at most one LLM call"""
+    all_categories = [category for book in books for category in book.get("categories") or [] if isinstance(category, str)]
+    translations = dict(zip(all_categories, translate_categories_to_arabic(all_categories)))
+
+    for book in books:
+        if book.get("categories"):
+            book["categories"] = [translations.get(category, category) for category in book["categories"]]
+    return books
+
+def localize_book_categories(book_data, target_language="ar"):
+    """
+    Localize book categories based on target language
+    """
+    try:
+        if target_language != "ar":
+            return book_data  # No localization needed for non-Arabic
+        
+        if not book_data.get("categories"):
+            return book_data
+        
+        # Check if categories are already in Arabic
+        categories = book_data["categories"]
+        has_arabic = any(contains_arabic(cat) for cat in categories)
+        
+        if has_arabic:
+            # Categories already contain Arabic, no translation needed
+            return book_data
+        
+        # Translate categories to Arabic
+        arabic_categories = translate_categories_to_arabic(categories)
+        
+        # Create localized book data
+        localized_data = book_data.copy()
+        localized_data["categories"] = arabic_categories
+        localized_data["original_categories"] = categories  # Keep original for reference
+        
+        return localized_data
+
+    except Exception as e:
+        print(f"Error in localize_book_categories: {e}")
+        return book_data
+
+def get_arabic_category_mapping():
+    """
+    Get a predefined mapping of common English to Arabic book categories
+    """
+    return {
+        "Fiction": "الأدب الخيالي",
+        "Non-fiction": "الأدب غير الخيالي", 
+        "History": "التاريخ",
+        "Science": "العلوم",
+        "Technology": "التكنولوجيا",
+        "Philosophy": "الفلسفة",
+        "Religion": "الدين",
+        "Biography": "السيرة الذاتية",
+        "Poetry": "الشعر",
+        "Drama": "المسرح",
+        "Literature": "الأدب",
+        "Education": "التعليم",
+        "Psychology": "علم النفس",
+        "Medicine": "الطب",
+        "Law": "القانون",
+        "Economics": "الاقتصاد",
+        "Politics": "السياسة",
+        "Art": "الفن",
+        "Music": "الموسيقى",
+        "Sports": "الرياضة",
+        "Travel": "السفر",
+        "Cooking": "الطبخ",
+        "Health": "الصحة",
+        "Business": "الأعمال",
+        "Self-help": "تطوير الذات",
+        "Romance": "الرومانسية",
+        "Mystery": "الغموض",
+        "Thriller": "الإثارة",
+        "Horror": "الرعب",
+        "Fantasy": "الخيال",
+        "Science Fiction": "الخيال العلمي",
+        "Children": "الأطفال",
+        "Young Adult": "الشباب",
+        "Comics": "الكوميكس",
+        "Reference": "المراجع",
+        "Textbook": "الكتب المدرسية",
+        "Academic": "الأكاديمي",
+        "Research": "البحث",
+        "Mathematics": "الرياضيات",
+        "Physics": "الفيزياء",
+        "Chemistry": "الكيمياء",
+        "Biology": "الأحياء",
+        "Geography": "الجغرافيا",
+        "Sociology": "علم الاجتماع",
+        "Anthropology": "علم الإنسان",
+        "Linguistics": "علم اللغة",
+        "Journalism": "الصحافة",
+        "Media": "الإعلام"
+    }
+
+def quick_translate_categories(categories):
+    """
+    Quick translation using predefined mapping and translation memory, fallback to LLM for unknown categories
+    """
+    return translate_categories_to_arabic(categories)
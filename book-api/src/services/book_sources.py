@@ -0,0 +1,324 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services import gutendex, http_client
+from src.services.dedup import merge_books
+from src.services.ia_resolver import resolve_pdf_url, resolve_pdf_urls
+from src.services.singleflight import coalesce
+
+GOOGLE_BOOKS_API = "https://www.googleapis.com/books/v1/volumes"
+
+# Helper function to get PDF URL from Google Books API response
+def get_google_books_pdf_url(access_info):
+    if access_info and access_info.get("viewability") == "FULL" and access_info.get("pdf") and access_info["pdf"].get("isAvailable"):
+        return access_info["pdf"].get("acsTokenLink") or access_info["pdf"].get("downloadLink")
+    return None
+
+# Helper function to get PDF URL from Gutendx API response
+def get_gutendx_pdf_url(formats):
+    if formats:
+        # Prioritize application/pdf, then text/html, then text/plain
+        if "application/pdf" in formats:
+            return formats["application/pdf"]
+        elif "text/html" in formats:
+            return formats["text/html"]
+        elif "text/plain" in formats:
+            return formats["text/plain"]
+    return None
+
+# Helper function to get PDF URL from Internet Archive with multiple fallbacks
+def get_internet_archive_pdf_url(identifier):
+    """Get the actual PDF download URL by querying Internet Archive metadata with multiple fallbacks"""
+    return resolve_pdf_url(identifier)
+
+@coalesce
+def search_google_books(search_terms, language="en", author=None, start_index=0):
+    """Search Google Books with intelligent query construction"""
+    try:
+        # Construct search query
+        query_parts = search_terms.copy()
+        if author:
+            query_parts.append(f"author:{author}")
+        
+        search_query = " ".join(query_parts)
+        
+        params = {
+            "q": search_query,
+            "langRestrict": language,
+            "maxResults": 10,
+            "startIndex": start_index
+        }
+        
+        response = http_client.get(GOOGLE_BOOKS_API, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        books = []
+        for item in data.get("items", []):
+            volume_info = item.get("volumeInfo", {})
+            access_info = item.get("accessInfo", {})
+            
+            title = volume_info.get("title")
+            authors = volume_info.get("authors", [])
+            categories = volume_info.get("categories", [])
+            description = volume_info.get("description")
+            image_links = volume_info.get("imageLinks", {})
+            thumbnail = image_links.get("thumbnail")
+            info_link = volume_info.get("infoLink")
+            
+            pdf_url = get_google_books_pdf_url(access_info)
+            
+            books.append({
+                "title": title,
+                "author": ", ".join(authors),
+                "categories": categories,
+                "description": description,
+                "thumbnail": thumbnail,
+                "info_link": info_link,
+                "pdf_links": [{"source": "Google Books", "url": pdf_url}] if pdf_url else [],
+                "source": "google_books"
+            })
+        
+        return books
+    except Exception as e:
+        print(f"Error searching Google Books: {e}")
+        return []
+
+@coalesce
+def search_gutendx(search_terms, language="en", page=1):
+    """Search Gutendx for public domain books"""
+    try:
+        books = []
+        for result in gutendex.search(" ".join(search_terms), page=page):
+            pdf_url = get_gutendx_pdf_url(result["formats"])
+            
+            if pdf_url:  # Only include books with available PDFs
+                books.append({
+                    "title": result["title"],
+                    "author": ", ".join(result["authors"]),
+                    "categories": result["subjects"],
+                    "description": "",  # Gutendx doesn't provide descriptions
+                    "thumbnail": None,  # Gutendx doesn't provide thumbnails directly
+                    "info_link": result["formats"].get("text/html"),
+                    "pdf_links": [{"source": "Gutendx", "url": pdf_url}],
+                    "source": "gutendx"
+                })
+        
+        return books
+    except Exception as e:
+        print(f"Error searching Gutendx: {e}")
+        return []
+
+@coalesce
+def search_project_gutenberg(search_terms, page=1):
+    """Search Project Gutenberg for free ebooks (same Gutendx query as search_gutendx, shared per request)"""
+    books = []
+    try:
+        for book in gutendex.search(" ".join(search_terms), page=page)[:10]:  # Limit to 10 results
+            subjects = book["subjects"]
+
+            # Get PDF download links
+            pdf_links = []
+            for format_key, url in book["formats"].items():
+                if "pdf" in format_key.lower():
+                    pdf_links.append({
+                        "source": "Project Gutenberg",
+                        "url": url
+                    })
+
+            if pdf_links:  # Only include books with PDF links
+                books.append({
+                    "title": book["title"],
+                    "author": ", ".join(book["authors"]),
+                    "categories": subjects,
+                    "description": f"Free ebook from Project Gutenberg. Subjects: {', '.join(subjects[:3])}",
+                    "thumbnail": "",
+                    "info_link": f"https://www.gutenberg.org/ebooks/{book['id'] or ''}",
+                    "pdf_links": pdf_links,
+                    "source": "project_gutenberg"
+                })
+
+    except Exception as e:
+        print(f"Project Gutenberg search failed: {e}")
+
+    return books
+
+@coalesce
+def search_open_library(search_terms, offset=0):
+    """Search Open Library for books with available downloads"""
+    books = []
+    try:
+        search_query = " ".join(search_terms)
+        params = {
+            "q": search_query,
+            "format": "json",
+            "limit": 10,
+            "offset": offset
+        }
+
+        response = http_client.get("https://openlibrary.org/search.json", params=params, timeout=10)
+        if response.is_success:
+            data = response.json()
+            docs = data.get("docs", [])
+
+            # Resolve the first archive ID of every doc in one concurrent batch
+            pdf_urls = resolve_pdf_urls([doc["ia"][0] for doc in docs if doc.get("ia")])
+
+            for doc in docs:
+                title = doc.get("title", "")
+                author_names = doc.get("author_name", [])
+                author = ", ".join(author_names) if author_names else ""
+                subjects = doc.get("subject", [])
+
+                # Check if book has available formats
+                ia_id = doc.get("ia", [])
+                if ia_id:
+                    # If it has Internet Archive ID, it might have downloadable formats
+                    pdf_links = []
+                    for archive_id in ia_id[:1]:  # Check first archive ID
+                        pdf_url = pdf_urls.get(archive_id)
+                        if pdf_url:
+                            pdf_links.append({
+                                "source": "Open Library (Internet Archive)",
+                                "url": pdf_url
+                            })
+
+                    if pdf_links:
+                        books.append({
+                            "title": title,
+                            "author": author,
+                            "categories": subjects[:5] if subjects else [],
+                            "description": f"Available through Open Library. Subjects: {', '.join(subjects[:3]) if subjects else 'Various'}",
+                            "thumbnail": f"https://covers.openlibrary.org/b/id/{doc.get('cover_i', '')}-M.jpg" if doc.get('cover_i') else "",
+                            "info_link": f"https://openlibrary.org{doc.get('key', '')}",
+                            "pdf_links": pdf_links,
+                            "source": "open_library"
+                        })
+
+    except Exception as e:
+        print(f"Open Library search failed: {e}")
+
+    return books
+
+IA_ADVANCED_SEARCH_API = "https://archive.org/advancedsearch.php"
+IA_SEARCH_FIELDS = "identifier,title,creator,description,subject,downloads"
+
+# Internet Archive query strategies as (name, query template, rows), grouped into
+# phases: every strategy in a phase runs concurrently, and later phases only run
+# while we still have fewer than IA_TARGET_RESULTS unique items.
+IA_SEARCH_PHASES = [
+    [
+        # Direct title search with PDF format
+        ("title_pdf", "title:({query}) AND mediatype:texts AND format:PDF", 15),
+        # Broader search without strict title matching
+        ("broad_pdf", "({query}) AND mediatype:texts AND format:PDF", 10)
+    ],
+    [
+        # Any text format, for items whose PDFs IA hasn't tagged
+        ("title_any", "title:({query}) AND mediatype:texts", 20)
+    ]
+]
+IA_TARGET_RESULTS = 15
+
+_ia_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ia-search")
+
+def fetch_internet_archive_docs(strategy, search_query, page=1):
+    """Run one advancedsearch.php query and return its raw docs"""
+    name, query_template, rows = strategy
+    params = {
+        "q": query_template.format(query=search_query),
+        "fl": IA_SEARCH_FIELDS,
+        "rows": rows,
+        "page": page,
+        "sort": "downloads desc",
+        "output": "json"
+    }
+    try:
+        response = http_client.get(IA_ADVANCED_SEARCH_API, params=params, timeout=15)
+        if response.is_success:
+            return response.json().get("response", {}).get("docs", [])
+    except Exception as e:
+        print(f"IA strategy {name} failed: {e}")
+    return []
+
+def plan_internet_archive_search(search_query, target=IA_TARGET_RESULTS, page=1):
+    """
+    Run the Internet Archive query strategies phase by phase and return the unique
+    docs in strategy priority order, stopping once enough unique items are found.
+    """
+    unique_docs = {}
+
+    for phase in IA_SEARCH_PHASES:
+        if len(unique_docs) >= target:
+            break
+
+        futures = [_ia_search_executor.submit(fetch_internet_archive_docs, strategy, search_query, page) for strategy in phase]
+        for future in futures:
+            for doc in future.result():
+                identifier = doc.get("identifier")
+                if identifier and identifier not in unique_docs:
+                    unique_docs[identifier] = doc
+
+    return list(unique_docs.values())
+
+@coalesce
+def search_internet_archive_comprehensive(search_terms, page=1):
+    """Comprehensive Internet Archive search with multiple strategies"""
+    search_query = " ".join(search_terms)
+
+    # Deduplicate across strategies first so each item's PDF is resolved only once
+    docs = plan_internet_archive_search(search_query, page=page)
+    books = parse_internet_archive_response({"response": {"docs": docs}})
+
+    # Only keep books that actually have PDFs
+    return [book for book in books if book.get("pdf_links")]
+
+def parse_internet_archive_response(data):
+    """Parse Internet Archive API response"""
+    books = []
+    docs = data.get("response", {}).get("docs", [])
+
+    # Resolve all PDF URLs in one concurrent batch instead of one doc at a time
+    pdf_urls = resolve_pdf_urls([doc.get("identifier") for doc in docs])
+
+    for doc in docs:
+        identifier = doc.get("identifier")
+        title = doc.get("title")
+        creator = doc.get("creator", [])
+        description = doc.get("description", "")
+        subjects = doc.get("subject", [])
+
+        if isinstance(creator, list):
+            author = ", ".join(creator)
+        else:
+            author = creator or ""
+
+        if isinstance(description, list):
+            description = " ".join(description)
+
+        if isinstance(subjects, list):
+            categories = subjects
+        else:
+            categories = [subjects] if subjects else []
+
+        pdf_url = pdf_urls.get(identifier)
+
+        books.append({
+            "title": title,
+            "author": author,
+            "categories": categories,
+            "description": description,
+            "thumbnail": f"https://archive.org/services/img/{identifier}",
+            "info_link": f"https://archive.org/details/{identifier}",
+            "pdf_links": [{"source": "Internet Archive", "url": pdf_url}] if pdf_url else [],
+            "source": "internet_archive"
+        })
+
+    return books
+
+def search_internet_archive(search_terms):
+    """Search Internet Archive for books with PDF downloads"""
+    return search_internet_archive_comprehensive(search_terms)
+
+def merge_duplicate_books(books):
+    """Merge books that are the same work (normalized title and author), combining their PDF links"""
+    return merge_books(books)
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.arabic_text import dedup_key
+from src.services.dedup import book_key
+from src.services.sqlite_store import get_connection
+
+CATALOG_FILE = "catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    book_key TEXT UNIQUE NOT NULL,
+    title TEXT,
+    author TEXT,
+    categories TEXT NOT NULL DEFAULT '[]',
+    description TEXT,
+    thumbnail TEXT,
+    info_link TEXT,
+    pdf_links TEXT NOT NULL DEFAULT '[]',
+    source TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, categories, description,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Bumped whenever what books_fts holds for a book changes; older files are reindexed on first use
+# (2: Arabic definite article dropped, so "مكتبة" finds "المكتبة")
+INDEX_VERSION = 2
+_index_checked = False
+_index_lock = threading.Lock()
+
+# Writes go through one thread so ingestion never blocks a request or races itself
+_ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-ingest")
+
+def _fts_row(title, author, categories, description):
+    # Indexed and queried in the same form, so folding and the article are ignored both ways
+    return (dedup_key(title), dedup_key(author),
+            dedup_key(" ".join(str(category) for category in categories)), dedup_key(description))
+
+def _reindex(connection):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        # Another worker may have got here first
+        if connection.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+            connection.execute("DELETE FROM books_fts")
+            rows = connection.execute("SELECT id, title, author, categories, description FROM books").fetchall()
+            connection.executemany(
+                "INSERT INTO books_fts (rowid, title, author, categories, description) VALUES (?, ?, ?, ?, ?)",
+                [(book_id,) + _fts_row(title, author, json.loads(categories), description)
+                 for book_id, title, author, categories, description in rows]
+            )
+            connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+
+def _connection():
+    global _index_checked
+    connection = get_connection(CATALOG_FILE, SCHEMA)
+    if not _index_checked:
+        with _index_lock:
+            if not _index_checked:
+                if connection.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+                    _reindex(connection)
+                _index_checked = True
+    return connection
+
+def _merge_pdf_links(existing, new):
+    urls = {link.get("url") for link in existing}
+    return existing + [link for link in new if link.get("url") not in urls]
+
+def _upsert(connection, book):
+    key = book_key(book)
+    row = connection.execute(
+        "SELECT id, categories, description, thumbnail, info_link, pdf_links FROM books WHERE book_key = ?",
+        (key,)
+    ).fetchone()
+
+    categories = book.get("categories") or []
+    description = book.get("description") or ""
+    thumbnail = book.get("thumbnail") or ""
+    info_link = book.get("info_link") or ""
+    pdf_links = book.get("pdf_links") or []
+
+    if row:
+        # Keep what we already know and fill in anything the new record adds
+        book_id, old_categories, old_description, old_thumbnail, old_info_link, old_pdf_links = row
+        categories = json.loads(old_categories) or categories
+        description = old_description or description
+        thumbnail = old_thumbnail or thumbnail
+        info_link = old_info_link or info_link
+        pdf_links = _merge_pdf_links(json.loads(old_pdf_links), pdf_links)
+
+        connection.execute(
+            "UPDATE books SET categories = ?, description = ?, thumbnail = ?, info_link = ?, pdf_links = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(categories, ensure_ascii=False), description, thumbnail, info_link,
+             json.dumps(pdf_links, ensure_ascii=False), time.time(), book_id)
+        )
+        connection.execute("DELETE FROM books_fts WHERE rowid = ?", (book_id,))
+    else:
+        book_id = connection.execute(
+            "INSERT INTO books (book_key, title, author, categories, description, thumbnail, info_link, pdf_links, source, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, book.get("title"), book.get("author"), json.dumps(categories, ensure_ascii=False), description,
+             thumbnail, info_link, json.dumps(pdf_links, ensure_ascii=False), book.get("source"), time.time())
+        ).lastrowid
+
+    connection.execute(
+        "INSERT INTO books_fts (rowid, title, author, categories, description) VALUES (?, ?, ?, ?, ?)",
+        (book_id,) + _fts_row(book.get("title"), book.get("author"), categories, description)
+    )
+
+def _ingest(books):
+    try:
+        connection = _connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for book in books:
+                if book.get("title"):
+                    _upsert(connection, book)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    except Exception as e:
+        print(f"Error ingesting books into catalog: {e}")
+
+def ingest_books(books):
+    """Upsert merged search results into the local catalog in the background"""
+    if books:
+        _ingest_executor.submit(_ingest, [dict(book) for book in books])
+
+def search_catalog(query, limit=20):
+    """Full-text search of every book we've seen, best matches first"""
+    tokens = dedup_key(query).split()
+    if not tokens:
+        return []
+
+    # Every token must match, as a prefix so partial words still find titles
+    match = " AND ".join(f'"{token}"*' for token in tokens)
+    try:
+        rows = _connection().execute(
+            "SELECT b.title, b.author, b.categories, b.description, b.thumbnail, b.info_link, b.pdf_links, b.source "
+            "FROM books_fts JOIN books b ON b.id = books_fts.rowid "
+            "WHERE books_fts MATCH ? ORDER BY bm25(books_fts, 10.0, 5.0, 2.0, 1.0) LIMIT ?",
+            (match, limit)
+        ).fetchall()
+    except Exception as e:
+        print(f"Error searching catalog: {e}")
+        return []
+
+    return [{
+        "title": title,
+        "author": author,
+        "categories": json.loads(categories),
+        "description": description,
+        "thumbnail": thumbnail,
+        "info_link": info_link,
+        "pdf_links": json.loads(pdf_links),
+        "source": source
+    } for title, author, categories, description, thumbnail, info_link, pdf_links, source in rows]
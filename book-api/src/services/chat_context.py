@@ -0,0 +1,86 @@
+import math
+import os
+
+# Most tokens of system prompt + summary + history + new message sent per chat completion
+PROMPT_TOKEN_BUDGET = int(os.environ.get("CHAT_PROMPT_TOKEN_BUDGET", 3000))
+
+# Once stored history grows past FOLD_AT_TOKENS, its older turns are folded into the rolling
+# summary until about KEEP_RECENT_TOKENS of the most recent turns are left
+FOLD_AT_TOKENS = PROMPT_TOKEN_BUDGET // 2
+KEEP_RECENT_TOKENS = PROMPT_TOKEN_BUDGET // 4
+SUMMARY_MAX_TOKENS = 300
+
+# Role markers and separators the chat template adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+def count_tokens(text):
+    """
+    Estimate how many tokens text takes. English averages about 4 characters per token;
+    Arabic and other non-Latin scripts split much finer, so they are counted at 2.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+def message_tokens(content):
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+def history_tokens(history):
+    return sum(message_tokens(content) for _, content in history)
+
+def compact_reply(reply, pdf_results):
+    """
+    The assistant turn as stored in history: the reply without the PDF link list appended
+    to it, only a one-line note of which books were shared
+    """
+    if not pdf_results:
+        return reply
+    shared = "; ".join(
+        f"{book['title']} by {book['author']}" if book.get("author") else book["title"]
+        for book in pdf_results
+    )
+    return f"{reply}\n\n[PDF downloads shared for: {shared}]"
+
+def build_prompt(system_prompt, summary, history, user_message, budget=PROMPT_TOKEN_BUDGET):
+    """
+    The messages for one completion: system prompt, rolling summary, then as many of the most
+    recent history messages as fit the budget, then the new message. History is cut at whole
+    turns, so the kept part always starts with a user message.
+    Returns (messages, prompt_tokens).
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+    used = sum(message_tokens(message["content"]) for message in messages) + message_tokens(user_message)
+
+    start = len(history)
+    while start > 0 and used + message_tokens(history[start - 1][1]) <= budget:
+        start -= 1
+        used += message_tokens(history[start][1])
+    while start < len(history) and history[start][0] != "user":
+        used -= message_tokens(history[start][1])
+        start += 1
+
+    messages.extend({"role": role, "content": content} for role, content in history[start:])
+    messages.append({"role": "user", "content": user_message})
+    return messages, used
+
+def messages_to_fold(history):
+    """
+    The oldest messages to fold into the summary, or [] while history is under FOLD_AT_TOKENS.
+    Whole turns are folded, so what is left starts with a user message.
+    """
+    if history_tokens(history) <= FOLD_AT_TOKENS:
+        return []
+
+    split = len(history)
+    kept = 0
+    while split > 0 and kept + message_tokens(history[split - 1][1]) <= KEEP_RECENT_TOKENS:
+        split -= 1
+        kept += message_tokens(history[split][1])
+    while split < len(history) and history[split][0] != "user":
+        split += 1
+    return history[:split]
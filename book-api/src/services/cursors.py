@@ -0,0 +1,42 @@
+import base64
+import binascii
+import hashlib
+import json
+
+# Books already returned are carried in the cursor itself as short digests of their keys,
+# so a cursor means the same thing however often, by whoever, and whenever it is replayed
+SEEN_DIGEST_BYTES = 5
+
+def encode_cursor(data):
+    """Pack cursor data into an opaque URL-safe token"""
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Unpack a cursor token; raises ValueError if it isn't one of ours"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+
+    if not isinstance(data, dict):
+        raise ValueError("Malformed cursor")
+    return data
+
+def seen_digest(key):
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=SEEN_DIGEST_BYTES).digest()
+
+def encode_seen(digests):
+    """Pack a set of seen digests into a compact URL-safe string"""
+    return base64.urlsafe_b64encode(b"".join(sorted(digests))).decode("ascii").rstrip("=")
+
+def decode_seen(text):
+    """Unpack encode_seen's string into a set of digests; raises ValueError if it isn't one"""
+    try:
+        raw = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed seen set: {e}")
+    if len(raw) % SEEN_DIGEST_BYTES:
+        raise ValueError("Malformed seen set")
+    return {raw[i:i + SEEN_DIGEST_BYTES] for i in range(0, len(raw), SEEN_DIGEST_BYTES)}
@@ -0,0 +1,173 @@
+import re
+
+from src.services.arabic_text import dedup_key, fold, search_key
+
+# Leading articles dropped from titles ("The Republic" == "Republic, The" == "Republic")
+TITLE_ARTICLES = {"the", "a", "an", "le", "la", "les", "el", "der", "die", "das"}
+
+# Titles whose token sets overlap at least this much are the same work
+TITLE_SIMILARITY_THRESHOLD = 0.85
+
+# Most clusters compared per blocking key, so huge blocks stay near-linear
+MAX_BLOCK_CANDIDATES = 50
+
+_SUBTITLE = re.compile(r"\s*(?::|;|\s[-–—]\s|\().*$")
+_TRAILING_ARTICLE = re.compile(r"^(.*),\s*(the|a|an)$")
+_VOLUME = re.compile(r"\b(?:volume|vol|part|pt|book|tome|no)\.?\s*(\d+|[ivxlc]+)\b")
+
+ROMAN_NUMERALS = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100}
+
+def _normalize_title(title):
+    return fold(title).replace("&", " and ").strip()
+
+def _without_volume(text):
+    # Volume numbers are compared on their own (see volume_numbers), not as title words
+    return _VOLUME.sub(" ", text).strip(" ,.-–—")
+
+def _roman_to_int(numeral):
+    total = 0
+    for char, next_char in zip(numeral, numeral[1:] + " "):
+        value = ROMAN_NUMERALS[char]
+        total += -value if ROMAN_NUMERALS.get(next_char, 0) > value else value
+    return total
+
+def title_tokens(title):
+    """Significant tokens of a title: no subtitle, volume number, punctuation or leading article"""
+    text = _normalize_title(title)
+    text = _SUBTITLE.sub("", text) or text
+    text = _without_volume(text) or text
+    text = _TRAILING_ARTICLE.sub(r"\2 \1", text)
+
+    tokens = dedup_key(text).split()
+    if len(tokens) > 1 and tokens[0] in TITLE_ARTICLES:
+        tokens = tokens[1:]
+    return tokens
+
+def subtitle_tokens(title):
+    """Significant tokens of what follows the main title ("The Two Towers" of "The Lord of the Rings: The Two Towers")"""
+    text = _normalize_title(title)
+    match = _SUBTITLE.search(text)
+    if not match or match.start() == 0:
+        return frozenset()
+    return frozenset(token for token in dedup_key(_without_volume(match.group())).split() if token not in TITLE_ARTICLES)
+
+def volume_numbers(title):
+    """Volume, part or book numbers anywhere in a title ("Vol. II" == "Volume 2")"""
+    numbers = set()
+    for number in _VOLUME.findall(_normalize_title(title)):
+        numbers.add(int(number) if number.isdigit() else _roman_to_int(number))
+    return frozenset(numbers)
+
+def author_tokens(author):
+    """Order-insensitive author tokens ("Austen, Jane" == "Jane Austen.")"""
+    return frozenset(search_key(author).split())
+
+def book_key(book):
+    """Exact identity of a book: normalized title, subtitle and volume plus sorted author tokens"""
+    title = " ".join(title_tokens(book.get("title")))
+    subtitle = " ".join(sorted(subtitle_tokens(book.get("title"))))
+    if subtitle:
+        title = f"{title}: {subtitle}"
+    volumes = sorted(volume_numbers(book.get("title")))
+    if volumes:
+        title = f"{title} vol {' '.join(map(str, volumes))}"
+    authors = " ".join(sorted(author_tokens(book.get("author"))))
+    return f"{title}|{authors}"
+
+def _compatible(set_a, set_b):
+    """Subtitles or volumes that are absent on one side, or match"""
+    return not set_a or not set_b or set_a == set_b
+
+def _similar_subtitles(subtitle_a, subtitle_b):
+    if not subtitle_a or not subtitle_b:
+        return True
+    return len(subtitle_a & subtitle_b) / len(subtitle_a | subtitle_b) >= TITLE_SIMILARITY_THRESHOLD
+
+def _similar(tokens_a, set_a, authors_a, tokens_b, set_b, authors_b):
+    if authors_a and authors_b and not authors_a & authors_b:
+        return False
+    if tokens_a == tokens_b:
+        # Same title; a missing author can only match an exact title
+        return True
+    if not authors_a or not authors_b:
+        return False
+    return len(set_a & set_b) / len(set_a | set_b) >= TITLE_SIMILARITY_THRESHOLD
+
+def _blocking_keys(tokens):
+    """Keys under which potential duplicates of a title are grouped"""
+    if not tokens:
+        return []
+    return [" ".join(tokens[:2]), max(tokens, key=len)]
+
+def _absorb(cluster, book, subtitle, volumes):
+    """Fold a duplicate into its cluster's merged record"""
+    merged = cluster["merged"]
+    for pdf_link in book.get("pdf_links", []):
+        if pdf_link.get("url") not in cluster["urls"]:
+            cluster["urls"].add(pdf_link.get("url"))
+            merged["pdf_links"].append(pdf_link)
+
+    # A cluster takes on the first subtitle and volume it sees, so it won't also absorb other parts of the work
+    cluster["subtitle"] = cluster["subtitle"] or subtitle
+    cluster["volumes"] = cluster["volumes"] or volumes
+
+    # Update other fields if they're empty in the existing book
+    for field in ("description", "thumbnail", "categories"):
+        if not merged.get(field) and book.get(field):
+            merged[field] = book[field]
+
+def merge_books(books):
+    """
+    Merge records of the same work, combining their PDF links (one per URL).
+    Exact normalized title+author matches are found by hash; other candidates come
+    from blocking keys on the main title and are scored on title token overlap.
+    Records with different subtitles or volume numbers (e.g. two volumes of one
+    work) are kept apart; a subtitle or volume missing on one side still matches.
+    Results keep the order in which each work was first seen.
+    """
+    clusters = []
+    exact_index = {}
+    blocks = {}
+
+    for book in books:
+        tokens = title_tokens(book.get("title"))
+        subtitle = subtitle_tokens(book.get("title"))
+        volumes = volume_numbers(book.get("title"))
+        authors = author_tokens(book.get("author"))
+        exact_key = (" ".join(tokens), subtitle, volumes, authors)
+
+        cluster = exact_index.get(exact_key)
+        if cluster is None and tokens:
+            token_set = set(tokens)
+            for key in _blocking_keys(tokens):
+                for candidate in blocks.get(key, [])[-MAX_BLOCK_CANDIDATES:]:
+                    if (
+                        _similar(tokens, token_set, authors, candidate["tokens"], candidate["token_set"], candidate["authors"])
+                        and _similar_subtitles(subtitle, candidate["subtitle"])
+                        and _compatible(volumes, candidate["volumes"])
+                    ):
+                        cluster = candidate
+                        break
+                if cluster is not None:
+                    break
+
+        if cluster is None:
+            merged = book.copy()
+            merged["pdf_links"] = []
+            cluster = {
+                "merged": merged,
+                "urls": set(),
+                "subtitle": subtitle,
+                "volumes": volumes,
+                "tokens": tokens,
+                "token_set": set(tokens),
+                "authors": authors
+            }
+            clusters.append(cluster)
+            for key in _blocking_keys(tokens):
+                blocks.setdefault(key, []).append(cluster)
+
+        exact_index.setdefault(exact_key, cluster)
+        _absorb(cluster, book, subtitle, volumes)
+
+    return [cluster["merged"] for cluster in clusters]
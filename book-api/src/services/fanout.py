@@ -0,0 +1,104 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Overall time (seconds) a fan-out may take before unfinished sources are abandoned
+DEFAULT_DEADLINE = 15
+
+# Shared worker pool for provider calls. Abandoned calls keep their worker until
+# their own HTTP timeout fires, so the pool is sized well above sources-per-request.
+FANOUT_MAX_WORKERS = 32
+
+# How often (seconds) a fan-out with a cancel event checks it
+CANCEL_POLL_INTERVAL = 0.1
+
+_executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix="fanout")
+
+def submit(fn):
+    """Start fn on the shared pool in a copy of the caller's context (so per-request state such as request_memo carries over)"""
+    return _executor.submit(contextvars.copy_context().run, fn)
+
+def iter_fanout(tasks, deadline=DEFAULT_DEADLINE, cancel=None):
+    """
+    Run provider tasks concurrently and yield (name, status, result) as each one settles.
+
+    tasks is a list of (name, fn, budget) tuples where fn takes no arguments and budget
+    is that source's latency budget in seconds (None means "the overall deadline").
+    status is "ok", "error" (result is the exception) or "timeout" (result is None).
+    Closing the generator early, or setting cancel (a threading.Event), abandons
+    whatever is still running.
+    """
+    started = time.monotonic()
+    pending = {}
+
+    for name, fn, budget in tasks:
+        future = submit(fn)
+        expires_at = started + min(budget or deadline, deadline)
+        pending[future] = (name, expires_at)
+
+    try:
+        while pending:
+            if cancel is not None and cancel.is_set():
+                break
+            now = time.monotonic()
+            for future, (name, expires_at) in list(pending.items()):
+                if not future.done() and now >= expires_at:
+                    del pending[future]
+                    future.cancel()
+                    yield name, "timeout", None
+
+            if not pending:
+                break
+
+            next_expiry = min(expires_at for _, expires_at in pending.values())
+            timeout = max(0, next_expiry - time.monotonic())
+            if cancel is not None:
+                timeout = min(timeout, CANCEL_POLL_INTERVAL)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, _ = pending.pop(future)
+                try:
+                    yield name, "ok", future.result()
+                except Exception as e:
+                    yield name, "error", e
+    finally:
+        for future in pending:
+            future.cancel()
+
+def run_fanout(tasks, deadline=DEFAULT_DEADLINE, stop_when=None, cancel=None):
+    """
+    Run provider tasks concurrently and collect whatever finishes before the deadline.
+
+    stop_when, if given, is called with the results so far after each success; once it
+    returns True the remaining tasks are abandoned, as they are once cancel is set.
+    Returns a dict with "results" (name -> result, in completion order), "timed_out",
+    "failed" and "abandoned" (lists of names) and "elapsed" (seconds).
+    """
+    started = time.monotonic()
+    results = {}
+    timed_out = []
+    failed = []
+
+    fanout = iter_fanout(tasks, deadline, cancel)
+    for name, status, result in fanout:
+        if status == "ok":
+            results[name] = result
+            if stop_when and stop_when(results):
+                fanout.close()
+                break
+        elif status == "timeout":
+            print(f"{name} timed out")
+            timed_out.append(name)
+        else:
+            print(f"{name} failed: {result}")
+            failed.append(name)
+
+    settled = set(results) | set(timed_out) | set(failed)
+    return {
+        "results": results,
+        "timed_out": timed_out,
+        "failed": failed,
+        "abandoned": [name for name, _, _ in tasks if name not in settled],
+        "elapsed": round(time.monotonic() - started, 3)
+    }
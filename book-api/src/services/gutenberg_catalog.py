@@ -0,0 +1,334 @@
+import hashlib
+import json
+import os
+import sys
+import tarfile
+import threading
+import time
+from lxml import etree
+
+from src.services import http_client
+from src.services.arabic_text import search_key
+from src.services.sqlite_store import DATABASE_DIR, get_connection
+
+# Project Gutenberg's bulk catalog: one RDF/XML file per ebook in a bzip2 tarball (~100 MB)
+PG_CATALOG_URL = os.environ.get("PG_CATALOG_URL", "https://www.gutenberg.org/cache/epub/feeds/rdf-files.tar.bz2")
+
+# Seconds between catalog refreshes; 0 disables the background refresh
+REFRESH_INTERVAL = int(os.environ.get("PG_CATALOG_REFRESH_INTERVAL", 24 * 60 * 60))
+
+# How often the background thread checks whether a refresh is due
+REFRESH_CHECK_INTERVAL = 60 * 60
+
+# Gutendex returns 32 books per page; the local index pages the same way
+PAGE_SIZE = 32
+
+INGEST_BATCH_SIZE = 1000
+
+CATALOG_FILE = "gutenberg.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pg_books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL DEFAULT '[]',
+    subjects TEXT NOT NULL DEFAULT '[]',
+    languages TEXT NOT NULL DEFAULT '',
+    formats TEXT NOT NULL DEFAULT '{}',
+    downloads INTEGER NOT NULL DEFAULT 0,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pg_books_downloads ON pg_books (downloads DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS pg_books_fts USING fts5(
+    title, authors,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS pg_catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+NS = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "pgterms": "http://www.gutenberg.org/2009/pgterms/",
+    "dcterms": "http://purl.org/dc/terms/"
+}
+EBOOK_TAG = f"{{{NS['pgterms']}}}ebook"
+RDF_ABOUT = f"{{{NS['rdf']}}}about"
+
+_ready = False
+_refresh_lock = threading.Lock()
+_scheduler_lock = threading.Lock()
+_scheduler_pid = None
+
+def _connection():
+    return get_connection(CATALOG_FILE, SCHEMA)
+
+def _get_meta(connection, key):
+    row = connection.execute("SELECT value FROM pg_catalog_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _set_meta(connection, key, value):
+    connection.execute(
+        "INSERT INTO pg_catalog_meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, None if value is None else str(value))
+    )
+
+def _parse_ebook(element):
+    """Turn one pgterms:ebook element into the shared Gutendex book model"""
+    about = element.get(RDF_ABOUT, "")
+    ebook_id = about.rsplit("/", 1)[-1]
+    if not ebook_id.isdigit():
+        return None
+
+    title = " ".join(element.findtext("dcterms:title", default="", namespaces=NS).split())
+    if not title:
+        return None
+
+    formats = {}
+    for file_element in element.iterfind("dcterms:hasFormat/pgterms:file", NS):
+        url = file_element.get(RDF_ABOUT)
+        mime_types = [value.text for value in file_element.iterfind("dcterms:format/rdf:Description/rdf:value", NS) if value.text]
+        # Zipped files list both the zip and the inner type; Gutendex keys them by the inner type
+        mime_type = next((mime for mime in mime_types if mime != "application/zip"), mime_types[0] if mime_types else None)
+        if url and mime_type and mime_type not in formats:
+            formats[mime_type] = url
+
+    downloads = element.findtext("pgterms:downloads", default="0", namespaces=NS)
+
+    return {
+        "id": int(ebook_id),
+        "title": title,
+        "authors": [name.text for name in element.iterfind("dcterms:creator/pgterms:agent/pgterms:name", NS) if name.text],
+        "subjects": [value.text for value in element.iterfind("dcterms:subject/rdf:Description/rdf:value", NS) if value.text],
+        "languages": [value.text for value in element.iterfind("dcterms:language/rdf:Description/rdf:value", NS) if value.text],
+        "formats": formats,
+        "downloads": int(downloads) if downloads.isdigit() else 0
+    }
+
+def parse_rdf_archive(fileobj):
+    """Stream-parse the RDF tarball, yielding one book per ebook without loading the archive into memory"""
+    with tarfile.open(fileobj=fileobj, mode="r|bz2") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.endswith(".rdf"):
+                continue
+            rdf_file = archive.extractfile(member)
+            for _, element in etree.iterparse(rdf_file, events=("end",), tag=EBOOK_TAG):
+                book = _parse_ebook(element)
+                element.clear()
+                if book:
+                    yield book
+
+def _digest(book):
+    return hashlib.sha1(json.dumps(book, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _ingest_batch(connection, books):
+    """Upsert a batch of books, skipping ones whose record hasn't changed; returns how many changed"""
+    digests = {book["id"]: _digest(book) for book in books}
+    placeholders = ",".join("?" * len(digests))
+    unchanged = {
+        book_id for book_id, digest in connection.execute(
+            f"SELECT id, digest FROM pg_books WHERE id IN ({placeholders})", list(digests)
+        ) if digests[book_id] == digest
+    }
+
+    changed = 0
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        for book in books:
+            if book["id"] in unchanged:
+                continue
+            connection.execute(
+                "INSERT OR REPLACE INTO pg_books (id, title, authors, subjects, languages, formats, downloads, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (book["id"], book["title"], json.dumps(book["authors"], ensure_ascii=False),
+                 json.dumps(book["subjects"], ensure_ascii=False), f",{','.join(book['languages'])},",
+                 json.dumps(book["formats"], ensure_ascii=False), book["downloads"], digests[book["id"]])
+            )
+            connection.execute("DELETE FROM pg_books_fts WHERE rowid = ?", (book["id"],))
+            connection.execute(
+                "INSERT INTO pg_books_fts (rowid, title, authors) VALUES (?, ?, ?)",
+                (book["id"], search_key(book["title"]), search_key(" ".join(book["authors"])))
+            )
+            changed += 1
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    return changed
+
+def ingest_archive(fileobj):
+    """Load an RDF tarball into the local index; returns (books seen, books changed)"""
+    global _ready
+    connection = _connection()
+    seen = changed = 0
+    batch = []
+
+    for book in parse_rdf_archive(fileobj):
+        batch.append(book)
+        if len(batch) >= INGEST_BATCH_SIZE:
+            changed += _ingest_batch(connection, batch)
+            seen += len(batch)
+            batch = []
+    if batch:
+        changed += _ingest_batch(connection, batch)
+        seen += len(batch)
+
+    _set_meta(connection, "book_count", connection.execute("SELECT COUNT(*) FROM pg_books").fetchone()[0])
+    _ready = seen > 0 or _ready
+    return seen, changed
+
+def _claim_refresh(connection, force=False):
+    """Claim the next refresh for this process so workers sharing the index don't all download it"""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        now = time.time()
+        last_refresh = float(_get_meta(connection, "refreshed_at") or 0)
+        claimed_at = float(_get_meta(connection, "refresh_claimed_at") or 0)
+        # A claim older than the check interval belongs to a worker that died mid-refresh
+        due = force or now - last_refresh >= REFRESH_INTERVAL
+        if not due or now - claimed_at < REFRESH_CHECK_INTERVAL:
+            connection.execute("COMMIT")
+            return False
+        _set_meta(connection, "refresh_claimed_at", now)
+        connection.execute("COMMIT")
+        return True
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+
+def refresh(force=False):
+    """
+    Download the catalog if it changed since the last refresh and ingest it.
+    Uses ETag/Last-Modified so an unchanged catalog costs one request; returns
+    True if the index was refreshed (or confirmed current).
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    try:
+        connection = _connection()
+        if not _claim_refresh(connection, force):
+            return False
+
+        headers = {}
+        if _get_meta(connection, "etag"):
+            headers["If-None-Match"] = _get_meta(connection, "etag")
+        if _get_meta(connection, "last_modified"):
+            headers["If-Modified-Since"] = _get_meta(connection, "last_modified")
+
+        started = time.monotonic()
+        download_path = os.path.join(DATABASE_DIR, "rdf-files.tar.bz2.part")
+        with http_client.stream("GET", PG_CATALOG_URL, headers=headers, timeout=60) as response:
+            if response.status_code == 304:
+                print("Project Gutenberg catalog is unchanged")
+                _set_meta(connection, "refreshed_at", time.time())
+                _set_meta(connection, "refresh_claimed_at", 0)
+                return True
+            response.raise_for_status()
+            with open(download_path, "wb") as download:
+                for chunk in response.iter_bytes():
+                    download.write(chunk)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        try:
+            with open(download_path, "rb") as archive:
+                seen, changed = ingest_archive(archive)
+        finally:
+            os.remove(download_path)
+
+        _set_meta(connection, "etag", etag)
+        _set_meta(connection, "last_modified", last_modified)
+        _set_meta(connection, "refreshed_at", time.time())
+        _set_meta(connection, "refresh_claimed_at", 0)
+        print(f"Project Gutenberg catalog refreshed: {seen} books, {changed} changed, {time.monotonic() - started:.1f}s")
+        return True
+    except Exception as e:
+        print(f"Error refreshing Project Gutenberg catalog: {e}")
+        return False
+    finally:
+        _refresh_lock.release()
+
+def _refresh_loop():
+    while True:
+        refresh()
+        time.sleep(REFRESH_CHECK_INTERVAL)
+
+def ensure_refresh_scheduled():
+    """Start the background refresh thread in this process (once per worker, after any fork)"""
+    global _scheduler_pid
+    if REFRESH_INTERVAL <= 0 or _scheduler_pid == os.getpid():
+        return
+    with _scheduler_lock:
+        if _scheduler_pid == os.getpid():
+            return
+        _scheduler_pid = os.getpid()
+    threading.Thread(target=_refresh_loop, name="pg-catalog-refresh", daemon=True).start()
+
+def is_ready():
+    """Whether the local index has been populated"""
+    global _ready
+    if not _ready:
+        try:
+            _ready = _connection().execute("SELECT 1 FROM pg_books LIMIT 1").fetchone() is not None
+        except Exception as e:
+            print(f"Error checking Project Gutenberg catalog: {e}")
+    return _ready
+
+def search(query, page=1, languages=None, mime_type=None):
+    """
+    Gutendex-style search of the local index: every word must appear in the title or
+    an author's name, most downloaded first. languages is a comma-separated list and
+    mime_type a prefix, as in the Gutendex API. Returns the shared Gutendex book model.
+    """
+    clauses = []
+    params = []
+
+    tokens = search_key(query).split()
+    if tokens:
+        clauses.append("b.id IN (SELECT rowid FROM pg_books_fts WHERE pg_books_fts MATCH ?)")
+        params.append(" AND ".join(f'"{token}"*' for token in tokens))
+
+    if languages:
+        codes = [code.strip() for code in languages.split(",") if code.strip()]
+        clauses.append("(" + " OR ".join("b.languages LIKE ?" for _ in codes) + ")")
+        params.extend(f"%,{code},%" for code in codes)
+
+    if mime_type:
+        clauses.append("EXISTS (SELECT 1 FROM json_each(b.formats) WHERE json_each.key LIKE ?)")
+        params.append(f"{mime_type}%")
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = _connection().execute(
+        f"SELECT b.id, b.title, b.authors, b.subjects, b.languages, b.formats FROM pg_books b {where} "
+        "ORDER BY b.downloads DESC LIMIT ? OFFSET ?",
+        params + [PAGE_SIZE, (max(page, 1) - 1) * PAGE_SIZE]
+    ).fetchall()
+
+    return [{
+        "id": book_id,
+        "title": title,
+        "authors": json.loads(authors),
+        "subjects": json.loads(subjects),
+        "languages": [code for code in languages_column.split(",") if code],
+        "formats": json.loads(formats)
+    } for book_id, title, authors, subjects, languages_column, formats in rows]
+
+def get_stats():
+    connection = _connection()
+    return {
+        "ready": is_ready(),
+        "book_count": int(_get_meta(connection, "book_count") or 0),
+        "refreshed_at": float(_get_meta(connection, "refreshed_at") or 0) or None
+    }
+
+if __name__ == "__main__":
+    # Batch ingest: python -m src.services.gutenberg_catalog [path/to/rdf-files.tar.bz2]
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as archive:
+            seen, changed = ingest_archive(archive)
+        print(f"Ingested {seen} books ({changed} changed)")
+    else:
+        refresh(force=True)
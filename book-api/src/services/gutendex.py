@@ -0,0 +1,37 @@
+from src.services import gutenberg_catalog, request_memo
+
+# Gutendex-compatible catalog the search providers query
+GUTENDX_API = "https://gutendx.com/books"
+
+def search(query, page=1, languages=None, mime_type=None):
+    """
+    Search Gutendex and return normalized books:
+    {"id", "title", "authors" (names), "subjects", "languages", "formats" (mime type -> url)}
+    Answered from the local Project Gutenberg index once it is populated; until then
+    (or if it fails) from the live API, where identical queries within one request go
+    out once (see request_memo). Raises httpx.HTTPError if the live API fails.
+    """
+    gutenberg_catalog.ensure_refresh_scheduled()
+    if gutenberg_catalog.is_ready():
+        try:
+            return gutenberg_catalog.search(query, page=page, languages=languages, mime_type=mime_type)
+        except Exception as e:
+            print(f"Local Project Gutenberg search failed, using Gutendx: {e}")
+
+    params = {"search": query, "page": page}
+    if languages:
+        params["languages"] = languages
+    if mime_type:
+        params["mime_type"] = mime_type
+    data = request_memo.get_json(GUTENDX_API, params=params, timeout=10)
+    return [normalize_book(result) for result in data.get("results", [])]
+
+def normalize_book(result):
+    return {
+        "id": result.get("id"),
+        "title": result.get("title") or "",
+        "authors": [author.get("name", "") for author in result.get("authors") or []],
+        "subjects": result.get("subjects") or [],
+        "languages": result.get("languages") or [],
+        "formats": result.get("formats") or {}
+    }
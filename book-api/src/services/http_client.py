@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import httpx
+
+from src.services import provider_health
+
+# Timeout (seconds) for any outbound call that doesn't pass its own
+DEFAULT_TIMEOUT = 10
+
+# Connection pool sizes; keep-alive connections are pooled per host by httpx
+MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 100))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+
+# Cap on concurrent requests to any single host
+MAX_IN_FLIGHT_PER_HOST = int(os.environ.get("HTTP_MAX_IN_FLIGHT_PER_HOST", 8))
+
+_client = None
+_client_lock = threading.Lock()
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+_metrics_hooks = []
+
+def _http2_enabled():
+    """HTTP/2 is opt-in through HTTP2_ENABLED and needs the optional h2 package"""
+    if os.environ.get("HTTP2_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("HTTP2_ENABLED is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+
+def get_client():
+    """Get the process-wide pooled client, creating it on first use (after any worker fork)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    http2=_http2_enabled(),
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+                    ),
+                    timeout=DEFAULT_TIMEOUT,
+                    follow_redirects=True
+                )
+    return _client
+
+def host_slot(host):
+    """Get the semaphore limiting in-flight requests to a host"""
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_IN_FLIGHT_PER_HOST)
+        return _host_slots[host]
+
+def add_metrics_hook(hook):
+    """
+    Register a callable invoked after every outbound request as
+    hook(endpoint, method, status_code, elapsed, error); endpoint is the host plus the first
+    path segment (see provider_health.endpoint_of) and status_code is None on errors.
+    """
+    _metrics_hooks.append(hook)
+
+def _report(endpoint, method, status_code, elapsed, error):
+    for hook in _metrics_hooks:
+        try:
+            hook(endpoint, method, status_code, elapsed, error)
+        except Exception as e:
+            print(f"Error in HTTP metrics hook: {e}")
+
+def _adaptive_timeout(endpoint, timeout):
+    """Cap a caller's timeout at the endpoint's adaptive timeout; structured timeouts pass through"""
+    if isinstance(timeout, httpx.Timeout):
+        return timeout
+    return provider_health.timeout_for(endpoint, default=timeout or DEFAULT_TIMEOUT)
+
+def request(method, url, **kwargs):
+    """
+    Send a request through the shared client, respecting the per-host cap.
+    Endpoints with an open circuit raise provider_health.CircuitOpenError (an httpx.HTTPError)
+    without a network call, and the timeout is capped from the endpoint's observed latency.
+    """
+    host = urlsplit(url).netloc
+    endpoint = provider_health.endpoint_of(url)
+    provider_health.acquire(endpoint)
+    kwargs["timeout"] = _adaptive_timeout(endpoint, kwargs.get("timeout"))
+    started = time.monotonic()
+    try:
+        with host_slot(host):
+            response = get_client().request(method, url, **kwargs)
+    except Exception as e:
+        _report(endpoint, method, None, time.monotonic() - started, e)
+        raise
+
+    _report(endpoint, method, response.status_code, time.monotonic() - started, None)
+    return response
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def head(url, **kwargs):
+    # Like requests.head, don't follow redirects unless asked to
+    kwargs.setdefault("follow_redirects", False)
+    return request("HEAD", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+@contextmanager
+def stream(method, url, **kwargs):
+    """Stream a response body through the shared client, holding a host slot until closed"""
+    host = urlsplit(url).netloc
+    endpoint = provider_health.endpoint_of(url)
+    provider_health.acquire(endpoint)
+    started = time.monotonic()
+    reported = False
+    with host_slot(host):
+        try:
+            with get_client().stream(method, url, **kwargs) as response:
+                _report(endpoint, method, response.status_code, time.monotonic() - started, None)
+                reported = True
+                yield response
+        except httpx.HTTPError as e:
+            # Errors raised by the caller while reading (raise_for_status, read timeouts)
+            # come after the status was recorded, so they are not counted a second time
+            if not reported:
+                _report(endpoint, method, None, time.monotonic() - started, e)
+            raise
+
+# Feed every outcome into the per-endpoint circuit breakers
+add_metrics_hook(provider_health.record)
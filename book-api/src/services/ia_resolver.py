@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from src.services import http_client, pdf_url_cache
+
+IA_METADATA_URL = "https://archive.org/metadata/{identifier}"
+IA_DOWNLOAD_URL = "https://archive.org/download/{identifier}/{filename}"
+
+# Separate pools so a resolver never waits on probes queued behind other resolvers
+_resolve_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ia-resolve")
+_probe_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="ia-probe")
+
+def _find_pdf_in_metadata(identifier):
+    """
+    Look for a PDF in the item's file list via the metadata API.
+    Only a 404 means the item has no PDF there; other error statuses (503, 429, ...) and
+    transport errors raise, so an outage is not cached as "no PDF".
+    """
+    metadata_url = IA_METADATA_URL.format(identifier=identifier)
+    response = http_client.get(metadata_url, timeout=10)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+    if response.is_success:
+        for file in response.json().get("files", []):
+            file_name = file.get("name", "")
+            file_format = file.get("format", "")
+
+            # Check if it's a PDF file (either by extension or format)
+            if (file_name.lower().endswith('.pdf') or
+                file_format.lower() in ['pdf', 'text pdf']):
+                return IA_DOWNLOAD_URL.format(identifier=identifier, filename=file_name)
+
+    return None
+
+def _fallback_urls(identifier):
+    """Common PDF filename patterns for an item, without duplicates"""
+    patterns = [
+        f"{identifier}.pdf",
+        f"{identifier.replace('-', ' ')}.pdf",
+        f"{identifier.replace('-', '_')}.pdf",
+        f"{identifier.title().replace('-', ' ')}.pdf",
+        f"{identifier.upper()}.pdf",
+        f"{identifier.lower()}.pdf"
+    ]
+    return [IA_DOWNLOAD_URL.format(identifier=identifier, filename=pattern) for pattern in dict.fromkeys(patterns)]
+
+def _probe(url):
+    """Quick HEAD request to check if the file exists"""
+    try:
+        return http_client.head(url, timeout=5).status_code == 200
+    except Exception:
+        return False
+
+def _race_probes(urls):
+    """Probe all candidate URLs at once and return the first that exists"""
+    pending = {_probe_executor.submit(_probe, url): url for url in urls}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                if future.result():
+                    return url
+    finally:
+        for future in pending:
+            future.cancel()
+    return None
+
+def _guess_pdf_url(identifier):
+    """The most likely PDF URL for an item, unverified"""
+    return IA_DOWNLOAD_URL.format(identifier=identifier, filename=f"{identifier}.pdf")
+
+def _resolve_uncached(identifier):
+    """
+    Find a verified PDF URL for one identifier, or None if the item has no PDF:
+    1. the first PDF in the item's metadata file list
+    2. the first common filename pattern that answers a HEAD request
+    """
+    try:
+        pdf_url = _find_pdf_in_metadata(identifier)
+    except Exception:
+        # Still try the filename patterns, but don't let the outage be cached as "no PDF"
+        pdf_url = _race_probes(_fallback_urls(identifier))
+        if pdf_url:
+            return pdf_url
+        raise
+
+    return pdf_url or _race_probes(_fallback_urls(identifier))
+
+def resolve_pdf_url(identifier):
+    """Resolve one Internet Archive identifier to a PDF download URL"""
+    if not identifier:
+        return None
+    return resolve_pdf_urls([identifier]).get(identifier)
+
+def resolve_pdf_urls(identifiers):
+    """
+    Resolve many identifiers concurrently, each one only once.
+    Identifiers in the persistent cache never touch archive.org. Items without a
+    verifiable PDF fall back to the most likely URL, as before.
+    Returns a dict mapping identifier -> PDF URL.
+    """
+    unique_identifiers = [identifier for identifier in dict.fromkeys(identifiers) if identifier]
+    resolved = pdf_url_cache.lookup(unique_identifiers)
+
+    futures = {
+        identifier: _resolve_executor.submit(_resolve_uncached, identifier)
+        for identifier in unique_identifiers if identifier not in resolved
+    }
+
+    fetched = {}
+    for identifier, future in futures.items():
+        try:
+            fetched[identifier] = future.result()
+        except Exception as e:
+            print(f"Error getting PDF URL from metadata for {identifier}: {e}")
+            resolved[identifier] = None
+
+    pdf_url_cache.store(fetched)
+    resolved.update(fetched)
+
+    return {identifier: resolved[identifier] or _guess_pdf_url(identifier) for identifier in unique_identifiers}
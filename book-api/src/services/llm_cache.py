@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from src.services.sqlite_store import get_connection
+
+CACHE_FILE = "llm_cache.db"
+
+# How long a memoized LLM answer is reused, and how many are kept (least recently used go first)
+TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 10000))
+
+# Expired and excess rows are swept every this many writes
+PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    template TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    latency REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used_at);
+"""
+
+_stats = {}
+_stats_lock = threading.Lock()
+_writes = 0
+
+def _connection():
+    return get_connection(CACHE_FILE, SCHEMA)
+
+def _record(template, **counts):
+    with _stats_lock:
+        stats = _stats.setdefault(template, {
+            "hits": 0, "misses": 0, "errors": 0,
+            "llm_latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+            "saved_latency": 0.0, "saved_tokens": 0
+        })
+        for name, value in counts.items():
+            stats[name] += value
+
+def make_key(model, template, version, inputs):
+    """Key for one model + prompt template version + normalized inputs"""
+    raw = json.dumps([model, template, version, inputs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _get(key):
+    now = time.time()
+    try:
+        connection = _connection()
+        row = connection.execute(
+            "SELECT payload, latency, prompt_tokens + completion_tokens FROM llm_responses WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        if row:
+            connection.execute("UPDATE llm_responses SET hits = hits + 1, last_used_at = ? WHERE key = ?", (now, key))
+    except Exception as e:
+        print(f"Error reading LLM cache: {e}")
+        return None
+    return row
+
+def _put(key, template, payload, latency, usage):
+    global _writes
+    now = time.time()
+    try:
+        connection = _connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO llm_responses "
+            "(key, template, payload, latency, prompt_tokens, completion_tokens, hits, created_at, last_used_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+            (key, template, json.dumps(payload, ensure_ascii=False), latency,
+             usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), now, now, now + TTL)
+        )
+        with _stats_lock:
+            _writes += 1
+            prune = _writes % PRUNE_EVERY == 0
+        if prune:
+            _prune(connection, now)
+    except Exception as e:
+        print(f"Error writing LLM cache: {e}")
+
+def _prune(connection, now):
+    connection.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+    connection.execute(
+        "DELETE FROM llm_responses WHERE key IN "
+        "(SELECT key FROM llm_responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+        (MAX_ENTRIES,)
+    )
+
+def cached_call(model, template, version, inputs, call):
+    """
+    Memoize an LLM call. call() returns (payload, usage) where payload is JSON-serializable
+    and usage has prompt_tokens/completion_tokens; exceptions propagate and nothing is stored.
+    Bump version whenever the prompt template changes so old answers stop matching.
+    """
+    key = make_key(model, template, version, inputs)
+    row = _get(key)
+    if row:
+        payload, latency, tokens = row
+        _record(template, hits=1, saved_latency=latency, saved_tokens=tokens)
+        return json.loads(payload)
+
+    started = time.monotonic()
+    try:
+        payload, usage = call()
+    except Exception:
+        _record(template, errors=1, llm_latency=time.monotonic() - started)
+        raise
+
+    latency = time.monotonic() - started
+    _record(
+        template, misses=1, llm_latency=latency,
+        prompt_tokens=usage.get("prompt_tokens", 0), completion_tokens=usage.get("completion_tokens", 0)
+    )
+    _put(key, template, payload, latency, usage)
+    return payload
+
+def get_stats():
+    """Per-template hits, misses, LLM time and tokens spent, and time and tokens saved by hits (this process)"""
+    with _stats_lock:
+        templates = {
+            template: {name: round(value, 3) if isinstance(value, float) else value for name, value in counts.items()}
+            for template, counts in _stats.items()
+        }
+    try:
+        entries = _connection().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+    except Exception as e:
+        print(f"Error reading LLM cache: {e}")
+        entries = None
+    return {"templates": templates, "entries": entries}
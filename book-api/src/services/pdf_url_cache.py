@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+from src.services.sqlite_store import get_connection
+
+CACHE_FILE = "pdf_url_cache.db"
+
+# Found PDFs practically never move; "no PDF" answers are retried sooner
+POSITIVE_TTL = int(os.environ.get("PDF_URL_CACHE_TTL", 30 * 24 * 3600))
+NEGATIVE_TTL = int(os.environ.get("PDF_URL_CACHE_NEGATIVE_TTL", 24 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ia_pdf_urls (
+    identifier TEXT PRIMARY KEY,
+    pdf_url TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+_counters = {"hits": 0, "negative_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+def _count(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+
+def lookup(identifiers):
+    """
+    Look up fresh cache entries for the given identifiers.
+    Returns a dict containing only the cached identifiers; a value of None means
+    the identifier is known to have no verifiable PDF.
+    """
+    identifiers = list(dict.fromkeys(identifier for identifier in identifiers if identifier))
+    if not identifiers:
+        return {}
+
+    now = time.time()
+    cached = {}
+    try:
+        connection = get_connection(CACHE_FILE, SCHEMA)
+        placeholders = ",".join("?" * len(identifiers))
+        rows = connection.execute(
+            f"SELECT identifier, pdf_url, fetched_at FROM ia_pdf_urls WHERE identifier IN ({placeholders})",
+            identifiers
+        ).fetchall()
+
+        for identifier, pdf_url, fetched_at in rows:
+            ttl = POSITIVE_TTL if pdf_url else NEGATIVE_TTL
+            if now - fetched_at < ttl:
+                cached[identifier] = pdf_url
+
+    except Exception as e:
+        print(f"Error reading PDF URL cache: {e}")
+        _count("errors")
+
+    negative = sum(1 for pdf_url in cached.values() if pdf_url is None)
+    _count("hits", len(cached) - negative)
+    _count("negative_hits", negative)
+    _count("misses", len(identifiers) - len(cached))
+    return cached
+
+def store(entries):
+    """Store identifier -> PDF URL results; None records that no PDF was found"""
+    if not entries:
+        return
+
+    now = time.time()
+    try:
+        connection = get_connection(CACHE_FILE, SCHEMA)
+        connection.executemany(
+            "INSERT OR REPLACE INTO ia_pdf_urls (identifier, pdf_url, fetched_at) VALUES (?, ?, ?)",
+            [(identifier, pdf_url, now) for identifier, pdf_url in entries.items()]
+        )
+        _count("stores", len(entries))
+    except Exception as e:
+        print(f"Error writing PDF URL cache: {e}")
+        _count("errors")
+
+def get_stats():
+    """Hit/miss counters for this process plus the size of the shared cache"""
+    with _counters_lock:
+        stats = dict(_counters)
+
+    lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups, 3) if lookups else 0.0
+
+    try:
+        connection = get_connection(CACHE_FILE, SCHEMA)
+        stats["entries"], stats["negative_entries"] = connection.execute(
+            "SELECT COUNT(*), COUNT(*) - COUNT(pdf_url) FROM ia_pdf_urls"
+        ).fetchone()
+    except Exception as e:
+        print(f"Error reading PDF URL cache size: {e}")
+
+    return stats
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+import httpx
+
+# Health is tracked per endpoint (host plus first path segment), so a host's fast calls
+# (archive.org/metadata, HEAD probes under archive.org/download) neither set the timeout of
+# its slow ones (archive.org/advancedsearch.php) nor trip a shared circuit with them
+
+# Rolling window of outcomes kept per endpoint
+WINDOW_SECONDS = int(os.environ.get("PROVIDER_HEALTH_WINDOW", 300))
+WINDOW_MAX_SAMPLES = 200
+
+# An endpoint's circuit opens when, within the window, at least MIN_REQUESTS were made and
+# ERROR_RATE_THRESHOLD of them failed, or after CONSECUTIVE_FAILURE_THRESHOLD failures in a row
+MIN_REQUESTS = 5
+ERROR_RATE_THRESHOLD = 0.5
+CONSECUTIVE_FAILURE_THRESHOLD = 5
+
+# How long an open circuit rejects calls before letting a probe request through
+OPEN_COOLDOWN = int(os.environ.get("PROVIDER_CIRCUIT_COOLDOWN", 30))
+
+# Adaptive timeout: observed p95 latency times a headroom factor, within these bounds
+# (but never below the p95 itself, and never above the caller's own timeout)
+MIN_LATENCY_SAMPLES = 10
+TIMEOUT_HEADROOM = 2
+MIN_TIMEOUT = 3
+MAX_TIMEOUT = 10
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+def endpoint_of(url):
+    """The endpoint a URL belongs to: its host and first path segment ("archive.org/metadata")"""
+    parts = urlsplit(url)
+    segment = parts.path.lstrip("/").split("/", 1)[0]
+    return f"{parts.netloc}/{segment}"
+
+class EndpointHealth:
+    """Rolling latency/error window and circuit state for one upstream endpoint"""
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW_MAX_SAMPLES)  # (timestamp, elapsed, ok)
+        self.state = CLOSED
+        self.opened_at = None
+        self.probe_started_at = None
+        self.consecutive_failures = 0
+        self.rejected = 0
+
+    def prune(self, now):
+        while self.samples and self.samples[0][0] < now - WINDOW_SECONDS:
+            self.samples.popleft()
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def latency_percentile(self, fraction):
+        latencies = sorted(elapsed for _, elapsed, ok in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+_endpoints = {}
+_lock = threading.Lock()
+
+def _endpoint_health(endpoint):
+    # Callers hold _lock
+    if endpoint not in _endpoints:
+        _endpoints[endpoint] = EndpointHealth()
+    return _endpoints[endpoint]
+
+def _is_failure(status_code, error):
+    """Transport errors, 5xx and rate limiting count against an endpoint; other 4xx don't"""
+    if error is not None:
+        return not isinstance(error, CircuitOpenError)
+    return status_code >= 500 or status_code == 429
+
+def acquire(endpoint):
+    """
+    Check whether a request to endpoint may go ahead; raises CircuitOpenError if not.
+    Once an open circuit has cooled down, one probe request at a time is let through.
+    """
+    now = time.monotonic()
+    with _lock:
+        health = _endpoint_health(endpoint)
+        if health.state == CLOSED:
+            return
+
+        if health.state == OPEN and now - health.opened_at >= OPEN_COOLDOWN:
+            health.state = HALF_OPEN
+
+        # A probe that never reported back (e.g. an abandoned stream) stops blocking after a cooldown
+        if health.state == HALF_OPEN and (health.probe_started_at is None or now - health.probe_started_at >= OPEN_COOLDOWN):
+            health.probe_started_at = now
+            return
+
+        health.rejected += 1
+    raise CircuitOpenError(f"Circuit open for {endpoint}")
+
+def record(endpoint, method, status_code, elapsed, error):
+    """Record the outcome of a request (http_client metrics hook) and update the circuit"""
+    if isinstance(error, CircuitOpenError):
+        return
+
+    failed = _is_failure(status_code, error)
+    now = time.monotonic()
+
+    with _lock:
+        health = _endpoint_health(endpoint)
+        health.prune(now)
+        health.samples.append((now, elapsed, not failed))
+        health.consecutive_failures = health.consecutive_failures + 1 if failed else 0
+
+        if health.state == HALF_OPEN:
+            health.probe_started_at = None
+            if failed:
+                _open(endpoint, health, now)
+            else:
+                print(f"Circuit closed for {endpoint}")
+                health.state = CLOSED
+                health.samples.clear()
+                health.samples.append((now, elapsed, True))
+            return
+
+        if health.state == CLOSED and failed and (
+            health.consecutive_failures >= CONSECUTIVE_FAILURE_THRESHOLD
+            or (len(health.samples) >= MIN_REQUESTS and health.error_rate() >= ERROR_RATE_THRESHOLD)
+        ):
+            _open(endpoint, health, now)
+
+def _open(endpoint, health, now):
+    print(f"Circuit opened for {endpoint}")
+    health.state = OPEN
+    health.opened_at = now
+
+def timeout_for(endpoint, default=MAX_TIMEOUT):
+    """
+    Timeout (seconds) for the next request to endpoint: its observed p95 latency times
+    TIMEOUT_HEADROOM, kept within MIN_TIMEOUT..MAX_TIMEOUT but never below the p95 itself,
+    and never above default (the caller's timeout, also used until there are enough samples)
+    """
+    with _lock:
+        health = _endpoints.get(endpoint)
+        if health is None:
+            return default
+        health.prune(time.monotonic())
+        if sum(1 for _, _, ok in health.samples if ok) < MIN_LATENCY_SAMPLES:
+            return default
+        p95 = health.latency_percentile(0.95)
+
+    adaptive = max(p95, min(MAX_TIMEOUT, max(MIN_TIMEOUT, p95 * TIMEOUT_HEADROOM)))
+    return round(min(default, adaptive), 2)
+
+def get_stats():
+    """Per-endpoint circuit state, error rate, latency percentiles and current timeout"""
+    now = time.monotonic()
+    with _lock:
+        endpoints = list(_endpoints.items())
+
+    stats = {}
+    for endpoint, health in endpoints:
+        with _lock:
+            health.prune(now)
+            p50 = health.latency_percentile(0.5)
+            p95 = health.latency_percentile(0.95)
+            stats[endpoint] = {
+                "state": health.state,
+                "requests": len(health.samples),
+                "error_rate": round(health.error_rate(), 3),
+                "consecutive_failures": health.consecutive_failures,
+                "rejected": health.rejected,
+                "latency_p50": round(p50, 3) if p50 is not None else None,
+                "latency_p95": round(p95, 3) if p95 is not None else None,
+                "open_for": round(now - health.opened_at, 1) if health.state != CLOSED else None
+            }
+        stats[endpoint]["timeout"] = timeout_for(endpoint)
+    return stats
@@ -0,0 +1,98 @@
+import contextvars
+import copy
+import functools
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+from src.services import http_client
+
+# Memo of outbound GETs for the request being handled; None outside a scope.
+# Threads started through fanout copy the context, so they share the same memo.
+_memo = contextvars.ContextVar("request_memo", default=None)
+
+_stats_lock = threading.Lock()
+_stats = {"fetched": 0, "reused": 0}
+
+def new_memo():
+    return {"calls": {}, "lock": threading.Lock()}
+
+@contextmanager
+def scope(memo=None):
+    """Collapse identical outbound GETs made while handling one request (nested scopes reuse the outer one)"""
+    if memo is None and _memo.get() is not None:
+        yield
+        return
+
+    token = _memo.set(memo if memo is not None else new_memo())
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+def bind(memo, fn):
+    """Wrap fn to run inside the given memo's scope, e.g. for tasks started from a generator"""
+    def run():
+        with scope(memo):
+            return fn()
+    return run
+
+def request_scoped(fn):
+    """Decorator: each call to fn (and the fan-out it starts) shares one memo scope"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with scope():
+            return fn(*args, **kwargs)
+    return wrapper
+
+def normalize_key(url, params=None):
+    """Key identifying an upstream query: scheme/host case, trailing slashes and param order don't matter"""
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/") or "/"
+    base = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+    items = sorted((str(key), str(value)) for key, value in (params or {}).items() if value is not None)
+    return f"{base}?{items}"
+
+def get_json(url, params=None, **kwargs):
+    """
+    GET a JSON document through http_client, raising on HTTP errors.
+    Inside a scope, the first caller for a key fetches it and every other caller
+    (concurrent or later) gets a copy of its result or its exception.
+    """
+    memo = _memo.get()
+    if memo is None:
+        return _fetch(url, params, **kwargs)
+
+    key = normalize_key(url, params)
+    with memo["lock"]:
+        call = memo["calls"].get(key)
+        leader = call is None
+        if leader:
+            call = {"done": threading.Event(), "result": None, "error": None}
+            memo["calls"][key] = call
+
+    with _stats_lock:
+        _stats["fetched" if leader else "reused"] += 1
+
+    if leader:
+        try:
+            call["result"] = _fetch(url, params, **kwargs)
+        except Exception as e:
+            call["error"] = e
+        finally:
+            call["done"].set()
+    else:
+        call["done"].wait()
+
+    if call["error"] is not None:
+        raise call["error"]
+    return copy.deepcopy(call["result"])
+
+def _fetch(url, params, **kwargs):
+    response = http_client.get(url, params=params, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
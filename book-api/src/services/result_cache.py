@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.arabic_text import cache_key
+from src.services.sqlite_store import get_connection
+
+CACHE_FILE = "result_cache.db"
+
+# Entries are served as-is while fresh, then served stale (and refreshed in the
+# background) until they expire
+FRESH_TTL = int(os.environ.get("RESULT_CACHE_FRESH_TTL", 15 * 60))
+STALE_TTL = int(os.environ.get("RESULT_CACHE_STALE_TTL", 24 * 3600))
+
+# L1 (in-process) is bounded by entry count and re-read from L2 after L1_TTL
+L1_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_L1_MAX_ENTRIES", 256))
+L1_TTL = int(os.environ.get("RESULT_CACHE_L1_TTL", 5 * 60))
+
+# Expired L2 rows are swept every this many writes
+L2_PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    fresh_until REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+class LRUCache:
+    """Thread-safe, size-bounded least-recently-used mapping"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+_l1 = LRUCache(L1_MAX_ENTRIES)
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+_counters = {"l1_hits": 0, "l2_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+_counters_lock = threading.Lock()
+_writes = 0
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+def make_key(endpoint, query, lang):
+    """Cache key for one endpoint + normalized query + language"""
+    return f"{endpoint}|{lang}|{cache_key(query)}"
+
+def _read_l2(key):
+    try:
+        row = get_connection(CACHE_FILE, SCHEMA).execute(
+            "SELECT payload, created_at, fresh_until, expires_at FROM search_results WHERE key = ?",
+            (key,)
+        ).fetchone()
+    except Exception as e:
+        print(f"Error reading result cache: {e}")
+        _count("errors")
+        return None
+
+    if not row:
+        return None
+    payload, created_at, fresh_until, expires_at = row
+    return {
+        "payload": json.loads(payload),
+        "created_at": created_at,
+        "fresh_until": fresh_until,
+        "expires_at": expires_at
+    }
+
+def _write_l2(key, entry):
+    global _writes
+    try:
+        connection = get_connection(CACHE_FILE, SCHEMA)
+        connection.execute(
+            "INSERT OR REPLACE INTO search_results (key, payload, created_at, fresh_until, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (key, json.dumps(entry["payload"], ensure_ascii=False), entry["created_at"], entry["fresh_until"], entry["expires_at"])
+        )
+
+        with _counters_lock:
+            _writes += 1
+            prune = _writes % L2_PRUNE_EVERY == 0
+        if prune:
+            connection.execute("DELETE FROM search_results WHERE expires_at < ?", (time.time(),))
+    except Exception as e:
+        print(f"Error writing result cache: {e}")
+        _count("errors")
+
+def _l1_set(key, entry):
+    _l1.set(key, (entry, min(time.time() + L1_TTL, entry["expires_at"])))
+
+def put(key, payload, fresh_ttl=FRESH_TTL, stale_ttl=STALE_TTL):
+    """Store a payload in both tiers"""
+    now = time.time()
+    entry = {
+        "payload": payload,
+        "created_at": now,
+        "fresh_until": now + fresh_ttl,
+        "expires_at": now + fresh_ttl + stale_ttl
+    }
+    _l1_set(key, entry)
+    _write_l2(key, entry)
+
+def _refresh(key, compute, ttl_for):
+    try:
+        payload = compute()
+        put(key, payload, ttl_for(payload) if ttl_for else FRESH_TTL)
+        _count("refreshes")
+    except Exception as e:
+        print(f"Error refreshing cached result for {key}: {e}")
+        _count("errors")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+def _schedule_refresh(key, compute, ttl_for):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    _refresh_executor.submit(_refresh, key, compute, ttl_for)
+
+def get(key, compute=None, ttl_for=None):
+    """
+    Look a key up in L1, then L2.
+    Returns (payload, cache_info), or (None, None) on a miss. Stale entries are still
+    returned; if compute is given they are also refreshed in the background.
+    """
+    now = time.time()
+    tier = "l1"
+    cached = _l1.get(key)
+    entry = None
+
+    # L1 copies expire sooner so refreshes done by other workers show up
+    if cached:
+        entry, l1_expires_at = cached
+        if now >= l1_expires_at:
+            _l1.delete(key)
+            entry = None
+
+    if entry is None:
+        tier = "l2"
+        entry = _read_l2(key)
+        if entry is None or now >= entry["expires_at"]:
+            _count("misses")
+            return None, None
+        _l1_set(key, entry)
+
+    stale = now >= entry["fresh_until"]
+    if stale:
+        _count("stale_hits")
+        if compute:
+            _schedule_refresh(key, compute, ttl_for)
+    else:
+        _count(f"{tier}_hits")
+
+    return entry["payload"], {
+        "hit": True,
+        "tier": tier,
+        "stale": stale,
+        "age": round(now - entry["created_at"], 1)
+    }
+
+def get_or_compute(key, compute, ttl_for=None):
+    """
+    Serve a cached payload (refreshing it in the background when stale) or compute,
+    store and return a new one. ttl_for(payload) may shorten the fresh TTL.
+    Returns (payload, cache_info).
+    """
+    payload, cache_info = get(key, compute, ttl_for)
+    if cache_info:
+        return payload, cache_info
+
+    payload = compute()
+    put(key, payload, ttl_for(payload) if ttl_for else FRESH_TTL)
+    return payload, {"hit": False}
+
+def get_stats():
+    """Hit/miss counters for this process plus tier sizes"""
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["l1_entries"] = len(_l1)
+
+    try:
+        stats["l2_entries"] = get_connection(CACHE_FILE, SCHEMA).execute(
+            "SELECT COUNT(*) FROM search_results"
+        ).fetchone()[0]
+    except Exception as e:
+        print(f"Error reading result cache size: {e}")
+
+    return stats
@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from src.services.sqlite_store import get_connection
+
+STORE_FILE = "chat_sessions.db"
+
+# "sqlite" shares sessions between worker processes; "memory" keeps them in this process only
+BACKEND = os.environ.get("CHAT_SESSION_BACKEND", "sqlite")
+
+# Sessions idle for longer than TTL are dropped; beyond MAX_SESSIONS (or, in memory,
+# MAX_BYTES of history) the least recently used go first
+TTL = int(os.environ.get("CHAT_SESSION_TTL", 2 * 3600))
+MAX_SESSIONS = int(os.environ.get("CHAT_SESSION_MAX_SESSIONS", 1000))
+MAX_BYTES = int(os.environ.get("CHAT_SESSION_MAX_BYTES", 32 * 1024 * 1024))
+
+# Session ids are client-chosen strings of at most this many characters
+MAX_SESSION_ID_LENGTH = 128
+
+# Expired and excess SQLite rows are swept every this many writes
+PRUNE_EVERY = 100
+
+# History is kept as (role, content) pairs with one-letter roles, beside a rolling
+# summary of the turns that have been folded out of it
+ROLE_CODES = {"user": "u", "assistant": "a"}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    history BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chat_sessions_updated_at ON chat_sessions (updated_at);
+"""
+
+# A turn reads, extends and writes back one session's history; these serialize that per
+# session (striped, so the number of locks stays fixed however many sessions there are)
+_session_locks = [threading.Lock() for _ in range(64)]
+
+def is_valid_session_id(session_id):
+    return isinstance(session_id, str) and 0 < len(session_id) <= MAX_SESSION_ID_LENGTH
+
+def session_lock(session_id):
+    return _session_locks[hash(session_id) % len(_session_locks)]
+
+def encode_session(summary, history):
+    """Pack a summary and [(role, content), ...] into a compressed blob"""
+    packed = {"s": summary, "h": [[ROLE_CODES[role], content] for role, content in history]}
+    return zlib.compress(json.dumps(packed, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+def decode_session(blob):
+    """(summary, history) from a blob made by encode_session"""
+    packed = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return packed["s"], [(ROLE_NAMES[code], content) for code, content in packed["h"]]
+
+def _session_size(summary, history):
+    return len(summary) + sum(len(content) for _, content in history)
+
+def _fold_history(history, folded):
+    """history without its leading folded messages, or None if it no longer starts with them"""
+    folded = list(folded)
+    if history[:len(folded)] != folded:
+        return None
+    return history[len(folded):]
+
+class MemorySessionStore:
+    """Sessions kept in this process, least recently used first out"""
+
+    def __init__(self, ttl=TTL, max_sessions=MAX_SESSIONS, max_bytes=MAX_BYTES):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session_id -> (summary, history tuple, size, updated_at)
+        self._bytes = 0
+        self._evictions = {"idle": 0, "capacity": 0}
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id, reason):
+        size = self._sessions.pop(session_id)[2]
+        self._bytes -= size
+        self._evictions[reason] += 1
+
+    def _evict(self, now):
+        # Oldest first, so idle sessions are all at the front
+        while self._sessions:
+            session_id, (_, _, _, updated_at) = next(iter(self._sessions.items()))
+            if now - updated_at < self.ttl:
+                break
+            self._drop(session_id, "idle")
+        while len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._sessions)), "capacity")
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return "", []
+            if time.time() - entry[3] >= self.ttl:
+                self._drop(session_id, "idle")
+                return "", []
+            return entry[0], list(entry[1])
+
+    def _save(self, session_id, summary, history):
+        size = _session_size(summary, history)
+        now = time.time()
+        with self._lock:
+            if session_id in self._sessions:
+                self._bytes -= self._sessions.pop(session_id)[2]
+            self._sessions[session_id] = (summary, tuple(history), size, now)
+            self._bytes += size
+            self._evict(now)
+
+    def append(self, session_id, messages, keep_last=None):
+        with session_lock(session_id):
+            summary, history = self.load(session_id)
+            history += list(messages)
+            if keep_last:
+                history = history[-keep_last:]
+            self._save(session_id, summary, history)
+
+    def fold(self, session_id, folded, summary):
+        with session_lock(session_id):
+            history = _fold_history(self.load(session_id)[1], folded)
+            if history is None:
+                return False
+            self._save(session_id, summary, history)
+            return True
+
+    def get_stats(self):
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "bytes": self._bytes, "evictions": dict(self._evictions)}
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file next to app.db, shared by every worker on the host"""
+
+    def __init__(self, ttl=TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _connection(self):
+        return get_connection(STORE_FILE, SCHEMA)
+
+    def _read(self, connection, session_id):
+        row = connection.execute(
+            "SELECT history FROM chat_sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        return decode_session(row[0]) if row else ("", [])
+
+    def load(self, session_id):
+        try:
+            return self._read(self._connection(), session_id)
+        except Exception as e:
+            print(f"Error reading chat session: {e}")
+            return "", []
+
+    def _update(self, session_id, change):
+        """
+        Apply change(summary, history) -> (summary, history), or None to leave the session
+        as it is, atomically across threads and workers. Returns whether it was written.
+        """
+        with session_lock(session_id):
+            try:
+                connection = self._connection()
+                # Take the write lock before reading so another worker's turn can't interleave
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    changed = change(*self._read(connection, session_id))
+                    if changed is not None:
+                        connection.execute(
+                            "INSERT OR REPLACE INTO chat_sessions (session_id, history, updated_at) VALUES (?, ?, ?)",
+                            (session_id, encode_session(*changed), time.time())
+                        )
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            except Exception as e:
+                print(f"Error writing chat session: {e}")
+                return False
+        return changed is not None
+
+    def append(self, session_id, messages, keep_last=None):
+        def change(summary, history):
+            history += list(messages)
+            return summary, history[-keep_last:] if keep_last else history
+
+        if not self._update(session_id, change):
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        try:
+            connection = self._connection()
+            connection.execute("DELETE FROM chat_sessions WHERE updated_at <= ?", (time.time() - self.ttl,))
+            connection.execute(
+                "DELETE FROM chat_sessions WHERE session_id IN "
+                "(SELECT session_id FROM chat_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+        except Exception as e:
+            print(f"Error pruning chat sessions: {e}")
+
+    def fold(self, session_id, folded, summary):
+        def change(_, history):
+            history = _fold_history(history, folded)
+            return None if history is None else (summary, history)
+
+        return self._update(session_id, change)
+
+    def get_stats(self):
+        try:
+            sessions, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(history)), 0) FROM chat_sessions WHERE updated_at > ?",
+                (time.time() - self.ttl,)
+            ).fetchone()
+        except Exception as e:
+            print(f"Error reading chat sessions: {e}")
+            sessions, size = None, None
+        return {"backend": "sqlite", "sessions": sessions, "bytes": size}
+
+def create_store(backend=BACKEND):
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown chat session backend: {backend}")
+
+_store = create_store()
+
+def load(session_id):
+    """
+    A session's (summary, history): the rolling summary of folded-out turns ("" if none) and
+    [(role, content), ...], oldest first. Both are empty for new or expired sessions.
+    """
+    return _store.load(session_id)
+
+def append(session_id, messages, keep_last=None):
+    """Atomically add (role, content) messages to a session, keeping only the last keep_last"""
+    _store.append(session_id, messages, keep_last)
+
+def fold(session_id, folded, summary):
+    """
+    Replace the leading folded messages of a session's history with an updated summary.
+    Returns False, changing nothing, if the history no longer starts with those messages.
+    """
+    return _store.fold(session_id, folded, summary)
+
+def get_stats():
+    return _store.get_stats()
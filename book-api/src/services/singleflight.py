@@ -0,0 +1,78 @@
+import copy
+import functools
+import threading
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+    The first caller runs the function; callers arriving while it runs wait and
+    receive a deep copy of its result (or its exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def begin(self, key):
+        """
+        Claim key for a computation the caller runs itself. Returns None if the caller leads
+        (and must then call finish), or else a function that waits for the leader's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+                self.executions += 1
+                return None
+            self.coalesced += 1
+        return lambda: self._wait(call)
+
+    def _wait(self, call):
+        call["done"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+        return copy.deepcopy(call["result"])
+
+    def finish(self, key, result=None, error=None):
+        """Hand the leader's result (or exception) to the callers waiting on key"""
+        with self._lock:
+            call = self._calls.pop(key)
+        call["result"] = result
+        call["error"] = error
+        call["done"].set()
+
+    def do(self, key, fn):
+        wait = self.begin(key)
+        if wait is not None:
+            return wait()
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def get_stats(self):
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+_groups = {}
+
+def coalesce(fn):
+    """Decorator: concurrent calls with equal arguments share one execution of fn"""
+    group = _groups.setdefault(fn.__qualname__, SingleFlight())
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = repr((args, sorted(kwargs.items())))
+        return group.do(key, lambda: fn(*args, **kwargs))
+
+    return wrapper
+
+def get_stats():
+    """Execution/coalesced counters for every decorated function"""
+    return {name: group.get_stats() for name, group in _groups.items()}
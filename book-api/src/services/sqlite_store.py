@@ -0,0 +1,31 @@
+import os
+import sqlite3
+import threading
+
+# SQLite files live next to app.db so every worker process on the host shares them
+DATABASE_DIR = os.environ.get(
+    "BOOKFINDER_DATABASE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "database")
+)
+
+_local = threading.local()
+
+def get_connection(filename, schema):
+    """
+    Get this thread's connection to a SQLite file under DATABASE_DIR, creating the
+    file and its schema on first use. Connections run in autocommit + WAL mode so
+    readers in other workers are never blocked by a writer.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    if filename not in connections:
+        os.makedirs(DATABASE_DIR, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(DATABASE_DIR, filename), timeout=10, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(schema)
+        connections[filename] = connection
+
+    return connections[filename]
@@ -0,0 +1,57 @@
+import time
+
+from src.services.sqlite_store import get_connection
+
+MEMORY_FILE = "translation_memory.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    target_lang TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (target_lang, source_text)
+);
+"""
+
+def lookup(texts, target_lang="ar"):
+    """Known translations for texts, as {text: translation}; texts never translated are left out"""
+    texts = list(dict.fromkeys(texts))
+    if not texts:
+        return {}
+
+    found = {}
+    try:
+        connection = get_connection(MEMORY_FILE, SCHEMA)
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(texts), 500):
+            chunk = texts[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(connection.execute(
+                f"SELECT source_text, translation FROM translations WHERE target_lang = ? AND source_text IN ({placeholders})",
+                [target_lang] + chunk
+            ).fetchall())
+    except Exception as e:
+        print(f"Error reading translation memory: {e}")
+    return found
+
+def store(translations, target_lang="ar"):
+    """Remember {text: translation} pairs permanently"""
+    if not translations:
+        return
+    try:
+        get_connection(MEMORY_FILE, SCHEMA).executemany(
+            "INSERT OR REPLACE INTO translations (target_lang, source_text, translation, created_at) VALUES (?, ?, ?, ?)",
+            [(target_lang, text, translation, time.time()) for text, translation in translations.items()]
+        )
+    except Exception as e:
+        print(f"Error writing translation memory: {e}")
+
+def get_stats():
+    try:
+        return dict(get_connection(MEMORY_FILE, SCHEMA).execute(
+            "SELECT target_lang, COUNT(*) FROM translations GROUP BY target_lang"
+        ).fetchall())
+    except Exception as e:
+        print(f"Error reading translation memory: {e}")
+        return {}
@@ -87,7 +87,10 @@ function App() {
         },
         body: JSON.stringify({
           query: searchQuery,
-          lang: language // Pass language to backend
+          lang: language, // Pass language to backend
+          stream: 'ndjson', // Receive results per source as they arrive
+          include_local: true, // Show previously seen matches right away
+          target_pdf_results: 10 // Stop once a page of reliable PDFs is found
         }),
       });
       
@@ -95,8 +98,31 @@ function App() {
         throw new Error('Search failed');
       }
       
-      const data = await response.json();
-      setBooks(data.results || []);
+      // Each line is one JSON frame: batch, merge or summary
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let merged = false;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const frame = JSON.parse(line);
+          if (frame.type === 'local' && !merged) {
+            setBooks(frame.results || []);
+          } else if (frame.type === 'merge') {
+            merged = true;
+            setBooks(frame.results || []);
+          }
+        }
+      }
     } catch (err) {
       setError('Failed to search books. Please try again.');
       console.error('Search error:', err);
@@ -153,7 +179,8 @@ function App() {
         },
         body: JSON.stringify({
           message: userMessage,
-          session_id: chatSessionId
+          session_id: chatSessionId,
+          stream: true // Receive the reply token by token
         }),
       });
 
@@ -161,14 +188,51 @@ function App() {
         throw new Error('LLM chat failed');
       }
 
-      const data = await response.json();
-
-      // Add AI response to chat
-      setChatMessages(prev => [...prev, {
-        sender: 'ai',
-        text: data.response,
-        pdfResults: data.pdf_results || []
-      }]);
+      // Server-sent events: token... with pdf_results once the search finishes, then done (or error)
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let text = '';
+      let pdfResults = [];
+      let pdfText = '';
+
+      const updateAiMessage = (message) => {
+        setChatMessages(prev => {
+          const last = prev[prev.length - 1];
+          if (last && last.sender === 'ai' && last.streaming) {
+            return [...prev.slice(0, -1), { ...last, ...message }];
+          }
+          return [...prev, { sender: 'ai', streaming: true, ...message }];
+        });
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffered += decoder.decode(value, { stream: true });
+        const events = buffered.split('\n\n');
+        buffered = events.pop();
+
+        for (const event of events) {
+          const type = event.match(/^event: (.*)$/m)?.[1];
+          const data = event.match(/^data: (.*)$/m)?.[1];
+          if (!type || !data) continue;
+          const payload = JSON.parse(data);
+
+          if (type === 'pdf_results') {
+            pdfResults = payload.pdf_results || [];
+            pdfText = payload.text || '';
+          } else if (type === 'token') {
+            text += payload.text;
+            updateAiMessage({ text: text + pdfText, pdfResults });
+          } else if (type === 'done') {
+            updateAiMessage({ text: payload.response, pdfResults, streaming: false });
+          } else if (type === 'error') {
+            throw new Error(payload.error);
+          }
+        }
+      }
 
     } catch (err) {
       console.error('LLM chat error:', err);